@@ -1,27 +1,101 @@
-from flask import Blueprint, request, jsonify, session, redirect, url_for
+from flask import Blueprint, request, session, redirect, url_for
 from marshmallow import ValidationError
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from .authSchema import UserSchema, LoginSchema
-from ..Models.User import User, db
+from ..Models.User import User
+from ..Models.Database import db
 from flask_dance.contrib.google import google
-from ...Utils.Response import base_response
+from ...Utils.Response import json_response
+from ...Utils.Passwords import password_hasher
+from ...Utils.Cache import app_cache, MemoryBackend
+from ...Utils.RateLimit import login_rate_limiters
 
 auth_bp = Blueprint('auth', __name__)
 
 user_schema = UserSchema()
 login_schema = LoginSchema()
 
+def identity_cache():
+    return app_cache('users', 'USER_CACHE')
+
+UNIQUE_FIELD_ERRORS = {
+    'google_id': 'Google ID already exists',
+    'email': 'Email already exists',
+}
+
+def identity(user, credentials=False):
+    if not user:
+        return None
+    entry = {'profile': user_schema.dump(user)}
+    if credentials:
+        entry['password_hash'] = user.password_hash
+    return entry
+
+def caches_credentials():
+    # Password hashes are only kept in the per-process memory backend, never
+    # in the sqlite one (a plain file shared by all workers).
+    return isinstance(identity_cache().backend, MemoryBackend)
+
+def find_identity(field, value):
+    return identity_cache().get(f'{field}:{value}', lambda: identity(User.query.filter_by(**{field: value}).first()))
+
+def login_identity(email):
+    """
+    Profile and password hash for a login: no query on a memory-cache hit,
+    one query otherwise.
+    """
+    def load():
+        return identity(User.query.filter_by(email=email).first(), credentials=True)
+
+    if not caches_credentials():
+        return load()
+    return identity_cache().get(f'login:{email}', load)
+
+def forget_identity(user):
+    identity_cache().invalidate(f'login:{user.email}')
+    if user.google_id:
+        identity_cache().invalidate(f'google_id:{user.google_id}')
+
+def duplicate_errors(email, google_id=None):
+    """
+    One query for the user-facing uniqueness messages; the unique indexes
+    still decide under concurrency.
+    """
+    conditions = [User.email == email]
+    if google_id:
+        conditions.append(User.google_id == google_id)
+    errors = {}
+    for existing in db.session.query(User.email, User.google_id).filter(or_(*conditions)).limit(2):
+        if existing.email == email:
+            errors['email'] = ['Email already exists']
+        if google_id and existing.google_id == google_id:
+            errors['google_id'] = ['Google ID already exists']
+    return errors
+
+def integrity_errors(error):
+    """
+    Field errors for a unique-constraint violation, from the constraint or
+    column the database names in its message.
+    """
+    message = str(getattr(error, 'orig', error)).lower()
+    errors = {field: [text] for field, text in UNIQUE_FIELD_ERRORS.items() if field in message}
+    return errors or {'user': ['User already exists']}
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
         data = user_schema.load(request.get_json())
-        
+        errors = duplicate_errors(data['email'], data.get('google_id'))
+        if errors:
+            raise ValidationError(errors)
+
         # Create new user
         user = User(
             email=data['email'],
             name=data.get('name'),
-            password_hash=generate_password_hash(data['password']) if data.get('password') else None,
+            password_hash=password_hasher().hash(data['password']) if data.get('password') else None,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
@@ -29,62 +103,97 @@ def register():
         db.session.add(user)
         db.session.commit()
         
-        return jsonify(base_response(
+        return json_response(
             code=201,
             status='success',
             message='User registered successfully',
             data=user_schema.dump(user)
-        )), 201
+        )
     except ValidationError as err:
-        return jsonify(base_response(
+        return json_response(
             code=400,
             status='error',
             message='Validation error',
             error=err.messages
-        )), 400
+        )
+    except IntegrityError as e:
+        # Lost a race with a concurrent registration
+        db.session.rollback()
+        return json_response(
+            code=400,
+            status='error',
+            message='Validation error',
+            error=integrity_errors(e)
+        )
     except Exception as e:
-        return jsonify(base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
-        )), 500
+        )
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
         data = login_schema.load(request.get_json())
-        
-        user = User.query.filter_by(email=data['email']).first()
-        
-        if not user or (user.password_hash and not check_password_hash(user.password_hash, data['password'])):
-            return jsonify(base_response(
+        email_limiter, ip_limiter = login_rate_limiters()
+        email_key = data['email'].lower()
+        ip_key = request.remote_addr  # the client's own address when PROXY_FIX_HOPS is set
+
+        # Reject before any hashing work once an email or IP keeps failing
+        retry_after = max(email_limiter.retry_after(email_key), ip_limiter.retry_after(ip_key))
+        if retry_after:
+            return json_response(
+                code=429,
+                status='error',
+                message='Too many failed login attempts',
+                error={'retry_after': retry_after},
+                headers={'Retry-After': str(retry_after)}
+            )
+
+        user = login_identity(data['email'])
+        password_hash = user['password_hash'] if user else None
+        hasher = password_hasher()
+
+        if not user or (password_hash and not hasher.verify(password_hash, data['password'])):
+            email_limiter.record_failure(email_key)
+            ip_limiter.record_failure(ip_key)
+            return json_response(
                 code=401,
                 status='error',
                 message='Invalid credentials'
-            )), 401
-            
-        session['user_id'] = user.user_id
-        return jsonify(base_response(
+            )
+
+        email_limiter.reset(email_key)
+        profile = user['profile']
+        if password_hash and hasher.needs_rehash(password_hash):
+            record = db.session.get(User, profile['user_id'])
+            record.password_hash = hasher.hash(data['password'])
+            db.session.commit()
+            forget_identity(record)
+
+        session['user_id'] = profile['user_id']
+        return json_response(
             code=200,
             status='success',
             message='Login successful',
-            data=user_schema.dump(user)
-        )), 200
+            data=profile
+        )
     except ValidationError as err:
-        return jsonify(base_response(
+        return json_response(
             code=400,
             status='error',
             message='Validation error',
             error=err.messages
-        )), 400
+        )
     except Exception as e:
-        return jsonify(base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
-        )), 500
+        )
 
 @auth_bp.route('/google_login')
 def google_login():
@@ -94,20 +203,20 @@ def google_login():
     try:
         resp = google.get("/oauth2/v2/userinfo")
         if not resp.ok:
-            return jsonify(base_response(
+            return json_response(
                 code=400,
                 status='error',
                 message='Failed to fetch user info'
-            )), 400
+            )
             
         google_info = resp.json()
         google_id = google_info['id']
         email = google_info['email']
         
-        user = User.query.filter_by(google_id=google_id).first()
+        user = find_identity('google_id', google_id)
         
         if not user:
-            user = User(
+            record = User(
                 email=email,
                 name=google_info.get('name'),
                 google_id=google_id,
@@ -115,29 +224,43 @@ def google_login():
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
-            db.session.add(user)
-            db.session.commit()
+            db.session.add(record)
+            try:
+                db.session.commit()
+            except IntegrityError as e:
+                # A concurrent callback created the same user first, unless
+                # the email already belongs to another account
+                db.session.rollback()
+                record = User.query.filter_by(google_id=google_id).first()
+                if record is None:
+                    return json_response(
+                        code=400,
+                        status='error',
+                        message='Validation error',
+                        error=integrity_errors(e)
+                    )
+            user = identity(record)
         
-        session['user_id'] = user.user_id
-        return jsonify(base_response(
+        session['user_id'] = user['profile']['user_id']
+        return json_response(
             code=200,
             status='success',
             message='Google login successful',
-            data=user_schema.dump(user)
-        )), 200
+            data=user['profile']
+        )
     except Exception as e:
-        return jsonify(base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
-        )), 500
+        )
 
 @auth_bp.route('/logout')
 def logout():
     session.pop('user_id', None)
-    return jsonify(base_response(
+    return json_response(
         code=200,
         status='success',
         message='Logged out successfully'
-    )), 200
\ No newline at end of file
+    )
\ No newline at end of file
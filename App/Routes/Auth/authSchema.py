@@ -1,5 +1,4 @@
-from marshmallow import Schema, fields, validates, ValidationError
-from ..Models.User import User
+from marshmallow import Schema, fields
 
 class UserSchema(Schema):
     user_id = fields.Int(dump_only=True)
@@ -11,16 +10,6 @@ class UserSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
 
-    @validates('email')
-    def validate_email(self, value):
-        if User.query.filter_by(email=value).first():
-            raise ValidationError('Email already exists')
-
-    @validates('google_id')
-    def validate_google_id(self, value):
-        if value and User.query.filter_by(google_id=value).first():
-            raise ValidationError('Google ID already exists')
-
 class LoginSchema(Schema):
     email = fields.Email(required=True)
     password = fields.Str(required=True, load_only=True)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import numpy as np
+from .jobs import DIRECTIONS
+
+try:
+    import msgpack
+except ImportError:  # optional, only the fixed-layout records are offered then
+    msgpack = None
+
+PROXIMITIES = ('Jauh', 'Dekat')
+WARNING_FORMAT = "⚠ Dekat! Arah: {}"
+# Index 0 is "no warning"; the rest are the only warnings the detector emits.
+WARNINGS = ('',) + tuple(WARNING_FORMAT.format(direction) for direction in DIRECTIONS)
+UNKNOWN_CLASS = 0xFFFF
+
+FLAG_RIGHT = 1  # direction is KANAN, otherwise KIRI
+FLAG_NEAR = 2  # proximity is Dekat, otherwise Jauh
+FLAG_WARNING = 4  # the detection carries a warning
+
+RECORDS_MIMETYPE = 'application/x-detection-records'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/vnd.msgpack', 'application/x-msgpack')
+
+# One little-endian 24-byte record per detection.
+DETECTION_DTYPE = np.dtype([
+    ('class_id', '<u2'),
+    ('flags', 'u1'),
+    ('warning_id', 'u1'),
+    ('confidence', '<f2'),
+    ('bbox', '<i2', (4,)),
+    ('depth', '<f2'),
+    ('sim_depth_x', '<f2'),
+    ('sim_depth_y', '<f2'),
+    ('sim_depth_gradient', '<f2'),
+    ('reserved', '<u2'),
+])
+FIELDS = tuple(name for name in DETECTION_DTYPE.names if name != 'reserved')
+
+_WARNING_IDS = {text: i for i, text in enumerate(WARNINGS)}
+_INT16 = np.iinfo(np.int16)
+
+
+def mimetypes():
+    """
+    Returns:
+        tuple: Compact media types this process can produce
+    """
+    return (RECORDS_MIMETYPE,) + (MSGPACK_MIMETYPES if msgpack is not None else ())
+
+
+def build_schema(labels):
+    """
+    Everything a compact-format client needs to decode /predict responses.
+
+    Clients fetch it once per session and keep it while the version they
+    get back in X-Detection-Schema stays the same.
+
+    Args:
+        labels (list): Label names indexed by class id
+
+    Returns:
+        dict: Schema, including its version
+    """
+    schema = {
+        'labels': list(labels),
+        'warnings': list(WARNINGS),
+        'directions': list(DIRECTIONS),
+        'proximities': list(PROXIMITIES),
+        'unknown_class': UNKNOWN_CLASS,
+        'flags': {'right': FLAG_RIGHT, 'near': FLAG_NEAR, 'warning': FLAG_WARNING},
+        'record': {
+            'mimetype': RECORDS_MIMETYPE,
+            'byteorder': 'little',
+            'size': DETECTION_DTYPE.itemsize,
+            'fields': [
+                {
+                    'name': name,
+                    'type': DETECTION_DTYPE.fields[name][0].base.str.lstrip('<|'),
+                    'count': DETECTION_DTYPE.fields[name][0].shape[0] if DETECTION_DTYPE.fields[name][0].shape else 1,
+                    'offset': DETECTION_DTYPE.fields[name][1],
+                }
+                for name in DETECTION_DTYPE.names
+            ],
+        },
+        'msgpack': {'mimetypes': list(MSGPACK_MIMETYPES), 'row': list(FIELDS)} if msgpack is not None else None,
+    }
+    schema['version'] = hashlib.sha1(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return schema
+
+
+def to_records(detections, label_ids):
+    """
+    Pack detection dicts into DETECTION_DTYPE records.
+
+    Direction, proximity and warning become flag bits and a warning_id into
+    the schema's warning table; boxes are clipped to int16.
+    """
+    records = np.zeros(len(detections), dtype=DETECTION_DTYPE)
+    for i, detection in enumerate(detections):
+        flags = 0
+        if detection['direction'] == DIRECTIONS[1]:
+            flags |= FLAG_RIGHT
+        if detection['proximity'] == PROXIMITIES[1]:
+            flags |= FLAG_NEAR
+        if detection['warning']:
+            flags |= FLAG_WARNING
+        records[i] = (
+            label_ids.get(detection['label'], UNKNOWN_CLASS),
+            flags,
+            _WARNING_IDS.get(detection['warning'], 0),
+            detection['confidence'],
+            np.clip(detection['bbox'], _INT16.min, _INT16.max),
+            detection['depth'],
+            detection['sim_depth_x'],
+            detection['sim_depth_y'],
+            detection['sim_depth_gradient'],
+            0,
+        )
+    return records
+
+
+def encode(detections, label_ids, mimetype):
+    """
+    Args:
+        detections (list): Detection dicts as returned by ObjectDetector.detect
+        label_ids (dict): Label name -> class id
+        mimetype (str): RECORDS_MIMETYPE or one of MSGPACK_MIMETYPES
+
+    Returns:
+        bytes: Response body
+    """
+    records = to_records(detections, label_ids)
+    if mimetype == RECORDS_MIMETYPE:
+        return records.tobytes()
+    # Rows are positional (see the schema's msgpack.row); floats keep the
+    # records' float16 precision but are sent as float32.
+    rows = [
+        [int(row['class_id']), int(row['flags']), int(row['warning_id']), float(row['confidence']),
+         row['bbox'].tolist(), float(row['depth']), float(row['sim_depth_x']), float(row['sim_depth_y']),
+         float(row['sim_depth_gradient'])]
+        for row in records
+    ]
+    return msgpack.packb(rows, use_single_float=True)
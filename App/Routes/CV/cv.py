@@ -1,13 +1,26 @@
+import os
 import time
-from flask import Blueprint, Response, jsonify, request
+from pathlib import Path
+import mimetypes
+import random
+import threading
+from contextlib import contextmanager
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, url_for
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from openvino.runtime import Core
 import logging
 from dataclasses import dataclass
 from typing import Optional
 import yaml
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+from ...Utils.Metrics import REGISTRY, stage, record_stage
+from ...Utils.preprocess.preprocess import decode_image
+from ...Utils.Precision import compile_properties, resolve_model
+from ...Utils.ETag import etag_header, not_modified
+from .jobs import VideoJobStore
+from .streams import InferencePool, StreamManager, configured_sources
+from . import compact
 
 # =================== CONFIGURATION CLASS ===================
 @dataclass
@@ -19,6 +32,24 @@ class Config:
     midas_model_xml: str = r"App/Routes/CV/yolo11n_openvino_model/yolo11n.xml"
     confidence_threshold: float = 0.6
     blur_kernel: tuple = (5, 5)
+    input_size: int = 640  # YOLO input side; uploads are decoded no smaller than this
+    precision: Optional[str] = None  # f32, bf16, f16 or int8; None keeps the OpenVINO default
+    sources: Optional[dict] = None  # name -> camera index or video path/URL; defaults to camera_id/video_path
+    stream_batch_size: int = 4  # most frames from different sources per detector call
+    stream_idle_timeout: float = 10.0  # seconds a source keeps capturing with no viewers
+    warmup_sizes: tuple = ((480, 640),)  # (height, width) of expected inputs
+    warmup_runs: int = 2
+    warmup_retry_interval: float = 30.0  # seconds between failed warm-up attempts
+    max_in_flight: int = 4  # /readyz reports saturation at this many /predict calls
+
+DEPTH_INPUT_SIZE = 256
+DEFAULT_PREDICT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Content types accepted as a raw image body, skipping multipart parsing
+RAW_IMAGE_TYPES = ('image/jpeg', 'image/png', 'image/webp', 'application/octet-stream')
+DEFAULT_VIDEO_JOB_MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+DEFAULT_VIDEO_JOB_BATCH_SIZE = 8
+MAX_VIDEO_JOB_BATCH_SIZE = 64
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 # =================== LOGGER SETUP =========================
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,31 +59,103 @@ logger = logging.getLogger(__name__)
 class ObjectDetector:
     def __init__(self, config: Config):
         self.config = config
-        self.core = Core()
+        self.core = None
         self.yolo_model = None
+        self.midas_model = None
         self.compiled_midas = None
         self.colors_yolo = None
+        self.label_ids = {}
+        self.yolo_path = None
+        self.yolo_batch = 0  # frames the YOLO IR takes per call; 0 if its batch is dynamic
+        self.yolo_precision = None
+        self.midas_precision = None
+        self.warmed = False
+        # ultralytics predictors are not thread-safe; /predict, video jobs and
+        # the stream pool all share this detector.
+        self._inference_lock = threading.Lock()
         self.fps = 0
         self.frame_count = 0
         self.start_time = None
 
-    def initialize(self) -> bool:
-        try:
-            self.yolo_model = YOLO(self.config.yolo_model_path, task="detect")
+    @property
+    def ready(self) -> bool:
+        return self.yolo_model is not None and self.compiled_midas is not None
+
+    def load(self):
+        # ultralytics (torch) and openvino take seconds to import, so they are
+        # only pulled in when a detector is actually needed.
+        from ultralytics import YOLO
+        from openvino.runtime import Core
+
+        if self.core is None:
+            self.core = Core()
+        if self.yolo_model is None:
+            self.yolo_path, self.yolo_precision = resolve_model(self.config.yolo_model_path, self.config.precision)
+            self.yolo_model = YOLO(self.yolo_path, task="detect")
+            self.yolo_batch = self._static_batch_size()
             self.colors_yolo = np.random.randint(0, 255, size=(len(self.yolo_model.names), 3), dtype="uint8")
+            self.label_ids = {name: cls_id for cls_id, name in self.yolo_model.names.items()}
+        if self.midas_model is None:
+            midas_xml, self.midas_precision = resolve_model(self.config.midas_model_xml, self.config.precision)
+            self.midas_model = self.core.read_model(midas_xml)
 
-            midas_model = self.core.read_model(self.config.midas_model_xml)
-            self.compiled_midas = self.core.compile_model(midas_model, "CPU")
-
-            logger.info("Successfully initialized YOLO and MiDaS models")
+    def initialize(self) -> bool:
+        try:
+            self.load()
+            # YOLO first: ready turns true once compiled_midas is set.
+            self._compile_yolo()
+            properties, self.midas_precision = compile_properties(self.core, "CPU", self.midas_precision)
+            self.compiled_midas = self.core.compile_model(self.midas_model, "CPU", properties)
+
+            logger.info(f"Successfully initialized YOLO ({self.yolo_precision or 'default'} precision) "
+                        f"and MiDaS ({self.midas_precision or 'default'} precision) models")
             return True
         except Exception as e:
             logger.error(f"Initialization failed: {str(e)}")
             return False
 
+    def _compile_yolo(self):
+        # ultralytics compiles the IR itself with no way to pass properties, so
+        # once its predictor exists the IR is recompiled here with the hint.
+        properties, self.yolo_precision = compile_properties(self.core, "CPU", self.yolo_precision)
+        if not properties:
+            return
+        size = self.config.input_size
+        self.yolo_model.predict(np.zeros((size, size, 3), dtype=np.uint8), verbose=False)
+        model = self.core.read_model(self._yolo_xml())
+        if model.get_parameters()[0].get_layout().empty:
+            from openvino.runtime import Layout
+            model.get_parameters()[0].set_layout(Layout("NCHW"))
+        self.yolo_model.predictor.model.ov_compiled_model = self.core.compile_model(
+            model, "CPU", {"PERFORMANCE_HINT": "LATENCY", **properties}
+        )
+
+    def _yolo_xml(self) -> Optional[Path]:
+        if os.path.isdir(self.yolo_path):
+            return next(Path(self.yolo_path).glob("*.xml"), None)
+        return Path(self.yolo_path) if self.yolo_path.endswith(".xml") else None
+
+    def _static_batch_size(self) -> int:
+        # The bundled export is static 1x3x640x640 and OpenVINO rejects larger
+        # batches, so such models are fed at most their batch size per call.
+        xml = self._yolo_xml()
+        if xml is None:
+            return 0
+        batch = self.core.read_model(xml).input(0).get_partial_shape()[0]
+        return batch.get_length() if batch.is_static else 0
+
+    def warmup(self, sizes, runs: int = 2):
+        # The first inferences at a given shape pay for lazy backend setup and
+        # kernel selection; run them on blank frames before real traffic.
+        for height, width in sizes:
+            frame = np.zeros((int(height), int(width), 3), dtype=np.uint8)
+            for _ in range(runs):
+                self.detect(frame)
+        self.warmed = True
+
     def estimate_depth(self, image: np.ndarray) -> np.ndarray:
         try:
-            img = cv2.resize(image, (256, 256))
+            img = cv2.resize(image, (DEPTH_INPUT_SIZE, DEPTH_INPUT_SIZE))
             img = img.astype(np.float32) / 255.0
             img = img.transpose(2, 0, 1)[np.newaxis, :]
             result = self.compiled_midas([img])[self.compiled_midas.output(0)]
@@ -63,13 +166,57 @@ class ObjectDetector:
             return np.zeros((image.shape[0], image.shape[1]))
 
     def process_frame(self, frame: np.ndarray) -> tuple[np.ndarray, dict, list]:
+        detections = self.detect(frame)
+        counts = self.draw(frame, detections)
+        return frame, counts, detections
+
+    def detect(self, frame: np.ndarray) -> list:
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames: list) -> list:
+        """
+        Run depth estimation and detection on frames without drawing on them.
+
+        A dynamic-batch YOLO model gets the whole list in one call, so
+        backends that batch (or pipeline requests, as OpenVINO does in
+        throughput mode) can; a static-batch one gets yolo_batch frames at a
+        time.
+
+        Returns:
+            list: One list of detection dicts per frame
+        """
+        wait_started = time.perf_counter()
+        with self._inference_lock:
+            record_stage('inference.wait', time.perf_counter() - wait_started)
+            with stage('inference.depth'):
+                depth_maps = [self.estimate_depth(frame) for frame in frames]
+            with stage('inference.detect'):
+                blurred = [cv2.GaussianBlur(frame, self.config.blur_kernel, 0) for frame in frames]
+                step = self.yolo_batch or len(blurred)
+                yolo_results = []
+                for start in range(0, len(blurred), step):
+                    yolo_results.extend(self.yolo_model(blurred[start:start + step]))
+
+        postprocess_started = time.perf_counter()
+        detections = [
+            self._detections(frame, depth_map, result)
+            for frame, depth_map, result in zip(frames, depth_maps, yolo_results)
+        ]
+        record_stage('inference.postprocess', time.perf_counter() - postprocess_started)
+        return detections
+
+    def draw(self, frame: np.ndarray, detections: list) -> dict:
         counts = {}
-        depth_map = self.estimate_depth(frame)
-        frame_blur = cv2.GaussianBlur(frame.copy(), self.config.blur_kernel, 0)
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox']
+            cls_id = self.label_ids.get(detection['label'], 0)
+            color = [int(c) for c in self.colors_yolo[cls_id % len(self.colors_yolo)]]
+            self._draw_detection(frame, x1, y1, x2, y2, detection['label'], detection['confidence'], color, counts)
+        return counts
 
-        yolo_results = self.yolo_model(frame_blur)[0]
+    def _detections(self, frame: np.ndarray, depth_map: np.ndarray, yolo_result) -> list:
         detections = []
-        for box in yolo_results.boxes:
+        for box in yolo_result.boxes:
             cls_id = int(box.cls)
             conf = float(box.conf)
             if conf < self.config.confidence_threshold:
@@ -79,7 +226,6 @@ class ObjectDetector:
             if label.lower() in ["cell phone"]:
                 continue
 
-            color = [int(c) for c in self.colors_yolo[cls_id % len(self.colors_yolo)]]
             x1, y1, x2, y2 = map(int, box.xyxy[0])
             
             # Calculate proximity data
@@ -91,10 +237,9 @@ class ObjectDetector:
             sim_depth_y = max(0.0, min(1.0, bottom_y / frame.shape[0]))
             sim_depth_gradient = (sim_depth_x + sim_depth_y) / 2
             direction = "KIRI" if (center_x - frame_center_x) < 0 else "KANAN"
-            warning_text = f"⚠ Dekat! Arah: {direction}" if sim_depth_gradient > 0.85 else ""
+            warning_text = compact.WARNING_FORMAT.format(direction) if sim_depth_gradient > 0.85 else ""
             proximity = "Dekat" if sim_depth_gradient > 0.85 else "Jauh"
 
-            self._draw_detection(frame, x1, y1, x2, y2, label, conf, color, depth_map, counts)
             detections.append({
                 'label': label,
                 'confidence': conf,
@@ -107,11 +252,10 @@ class ObjectDetector:
                 'warning': warning_text,
                 'proximity': proximity
             })
-
-        return frame, counts, detections
+        return detections
 
     def _draw_detection(self, frame: np.ndarray, x1: int, y1: int, x2: int, y2: int,
-                    label: str, conf: float, color: list, depth_map: np.ndarray, counts: dict):
+                    label: str, conf: float, color: list, counts: dict):
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
         cv2.putText(frame, f"{label} {conf:.2f}", (x1, y1 - 5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
@@ -170,12 +314,6 @@ class ObjectDetector:
         if self.start_time is None:
             self.start_time = time.time()
 
-        y_offset = 20
-        for label, count in counts.items():
-            cv2.putText(frame, f"{label}: {count}", (10, y_offset),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            y_offset += 20
-
         self.frame_count += 1
         elapsed_time = time.time() - self.start_time
         if elapsed_time > 1:
@@ -183,12 +321,27 @@ class ObjectDetector:
             self.frame_count = 0
             self.start_time = time.time()
 
-        cv2.putText(frame, f"FPS: {self.fps:.2f}", (10, y_offset),
+        self.draw_counts(frame, counts, self.fps)
+
+    @staticmethod
+    def draw_counts(frame: np.ndarray, counts: dict, fps: float):
+        y_offset = 20
+        for label, count in counts.items():
+            cv2.putText(frame, f"{label}: {count}", (10, y_offset),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            y_offset += 20
+
+        cv2.putText(frame, f"FPS: {fps:.2f}", (10, y_offset),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
 # =================== FLASK BLUEPRINT ===================
 inference_bp = Blueprint('inference', __name__, template_folder='../../templates')
 
+@inference_bp.record_once
+def _register_readiness(state):
+    from ..Health.health import register_readiness_check
+    register_readiness_check(state.app, 'inference', inference_readiness)
+
 def load_config(config_path: str = "config.yaml") -> Config:
     try:
         with open(config_path, 'r') as f:
@@ -201,53 +354,346 @@ def load_config(config_path: str = "config.yaml") -> Config:
         logger.error(f"Error loading config: {str(e)}")
         return Config()
 
-# Initialize detector
 config = load_config()
-detector = ObjectDetector(config)
-if not detector.initialize():
-    logger.error("Failed to initialize ObjectDetector")
-
-def generate_frames():
-    cap = cv2.VideoCapture(config.camera_id if config.use_camera else config.video_path)
-    if not cap.isOpened():
-        logger.error(f"Failed to open {'camera' if config.use_camera else config.video_path}")
-        return
-    try:
-        while True:
-            success, frame = cap.read()
-            if not success:
-                logger.info("Finished processing video")
-                break
-
-            frame, counts, _ = detector.process_frame(frame)
-            detector.display_counts(frame, counts)
-
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
 
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+# The detector is built on first use (or by preload_models) rather than at
+# import time, so importing this module stays cheap.
+_detector = None
+_detector_lock = threading.Lock()
+
+def _shared_detector() -> ObjectDetector:
+    global _detector
+    if _detector is None:
+        _detector = ObjectDetector(config)
+    return _detector
+
+def preload_models():
+    """
+    Import the inference libraries and read the model files without compiling.
+
+    Called before forking so workers share them copy-on-write; compiled
+    models own thread pools that do not survive a fork, so compilation is
+    left to get_detector() in each worker.
+    """
+    with _detector_lock:
+        _shared_detector().load()
+
+def get_detector() -> ObjectDetector:
+    """
+    Return the process-wide detector, initializing it on first call.
+
+    Raises:
+        RuntimeError: If the models could not be loaded
+    """
+    detector = _detector
+    if detector is not None and detector.ready:
+        return detector
+    with _detector_lock:
+        detector = _shared_detector()
+        if not detector.ready and not detector.initialize():
+            raise RuntimeError("Failed to initialize ObjectDetector")
+    return detector
+
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup_error = None
+_warmup_failed_at = None
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+PREDICT_IN_FLIGHT = REGISTRY.gauge('inference_predict_in_flight', '/predict calls currently running inference.')
+
+def warm_up() -> bool:
+    """
+    Initialize the detector and run dummy inferences at every configured size.
+
+    Returns:
+        bool: True if the detector is ready for traffic
+    """
+    global _warmup_error, _warmup_failed_at
+    try:
+        detector = get_detector()
+        with _detector_lock:
+            if not detector.warmed:
+                started = time.perf_counter()
+                detector.warmup(config.warmup_sizes, config.warmup_runs)
+                logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+        _warmup_error = None
+        return True
     except Exception as e:
-        logger.error(f"Error in generate_frames: {str(e)}")
+        _warmup_error = str(e)
+        _warmup_failed_at = time.monotonic()
+        logger.error(f"Warm-up failed: {str(e)}")
+        return False
+
+def start_warm_up():
+    """Run warm_up() in a background thread unless it is running or done."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _detector is not None and _detector.warmed:
+            return
+        if _warmup_thread is not None and _warmup_thread.is_alive():
+            return
+        if _warmup_failed_at is not None and time.monotonic() - _warmup_failed_at < config.warmup_retry_interval:
+            return
+        _warmup_thread = threading.Thread(target=warm_up, name='model-warmup', daemon=True)
+        _warmup_thread.start()
+
+def is_ready() -> bool:
+    return _detector is not None and _detector.ready and _detector.warmed
+
+def inference_readiness():
+    """
+    Readiness check for /readyz; starts the warm-up if it has not run yet.
+
+    Returns:
+        tuple: (ready, details)
+    """
+    if not is_ready():
+        start_warm_up()
+        if _warmup_error is not None:
+            return False, {'models': 'failed', 'error': _warmup_error}
+        return False, {'models': 'warming_up'}
+    in_flight = _in_flight
+    details = {'models': 'ready', 'in_flight': in_flight, 'max_in_flight': config.max_in_flight}
+    return in_flight < config.max_in_flight, details
+
+@contextmanager
+def _track_in_flight():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    PREDICT_IN_FLIGHT.inc()
+    try:
+        yield
     finally:
-        cap.release()
+        with _in_flight_lock:
+            _in_flight -= 1
+        PREDICT_IN_FLIGHT.dec()
+
+def render_stream_frame(frame: np.ndarray, detections: list, fps: float) -> bytes:
+    detector = get_detector()
+    counts = detector.draw(frame, detections)
+    detector.draw_counts(frame, counts, fps)
+    ret, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+_streams = None
+_streams_lock = threading.Lock()
+
+def stream_manager() -> StreamManager:
+    # Built on first use so capture and inference threads start in the
+    # worker process, never in a pre-fork master.
+    global _streams
+    with _streams_lock:
+        if _streams is None:
+            pool = InferencePool(get_detector, max_batch=config.stream_batch_size)
+            _streams = StreamManager(
+                configured_sources(config), pool, render_stream_frame, idle_timeout=config.stream_idle_timeout
+            )
+    return _streams
 
 @inference_bp.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(),
+    return Response(stream_manager().default().frames(),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@inference_bp.route('/video_feed/<source>')
+def video_feed_source(source):
+    stream = stream_manager().get(source)
+    if stream is None:
+        return jsonify({'error': f'Unknown source: {source}'}), 404
+    return Response(stream.frames(),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@inference_bp.route('/video_sources', methods=['GET'])
+def video_sources():
+    return jsonify({'sources': stream_manager().stats()})
+
+def read_image_upload(limit: int) -> Optional[bytes]:
+    """
+    Read the uploaded image, either a raw body or the multipart 'image' field.
+
+    Raises:
+        RequestEntityTooLarge: If the upload is larger than limit bytes
+    """
+    if request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    if request.mimetype in RAW_IMAGE_TYPES:
+        data = request.stream.read(limit + 1)
+    elif 'image' in request.files:
+        data = request.files['image'].read(limit + 1)
+    else:
+        return None
+    if len(data) > limit:
+        raise RequestEntityTooLarge()
+    return data or None
+
+def scale_detections(detections: list, scale: tuple) -> list:
+    # Map boxes from the reduced decode back to the uploaded image's pixels.
+    scale_x, scale_y = scale
+    if scale_x == 1.0 and scale_y == 1.0:
+        return detections
+    for detection in detections:
+        x1, y1, x2, y2 = detection['bbox']
+        detection['bbox'] = [round(x1 * scale_x), round(y1 * scale_y), round(x2 * scale_x), round(y2 * scale_y)]
+    return detections
+
+_compact_schema = None
+
+def compact_schema() -> dict:
+    global _compact_schema
+    if _compact_schema is None:
+        names = get_detector().yolo_model.names
+        _compact_schema = compact.build_schema([names[i] for i in sorted(names)])
+    return _compact_schema
+
+@inference_bp.route('/predict/schema', methods=['GET'])
+def predict_schema():
+    """
+    Label and warning tables plus the record layout for compact /predict
+    responses; fetch once per session.
+    """
+    if not is_ready():
+        start_warm_up()
+        return jsonify({'error': 'Inference service is not ready'}), 503, {'Retry-After': '5'}
+    schema = compact_schema()
+    cached = not_modified(schema['version'])
+    if cached:
+        return cached
+    return jsonify(schema), 200, etag_header(schema['version'])
+
 @inference_bp.route('/predict', methods=['POST'])
 def predict():
-    if 'image' not in request.files:
-        return jsonify({'error': 'No image provided'}), 400
+    """
+    Detect objects in an uploaded image.
+
+    Responds with JSON unless the Accept header prefers a compact format:
+    fixed-layout records (application/x-detection-records) or MessagePack
+    rows; see /predict/schema for how to decode them.
+    """
+    if not is_ready():
+        start_warm_up()
+        return jsonify({'error': 'Inference service is not ready'}), 503, {'Retry-After': '5'}
     try:
-        image_file = request.files['image']
-        file_bytes = np.frombuffer(image_file.read(), np.uint8)
-        image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-        _, _, detections = detector.process_frame(image)
-        logger.info(f"Detections: {detections}")
-
+        limit = int(current_app.config.get('PREDICT_MAX_UPLOAD_BYTES', DEFAULT_PREDICT_MAX_UPLOAD_BYTES))
+        data = read_image_upload(limit)
+        if data is None:
+            return jsonify({'error': 'No image provided'}), 400
+        with stage('inference.decode'):
+            image, scale = decode_image(data, config.input_size, DEPTH_INPUT_SIZE)
+        del data
+        if image is None:
+            return jsonify({'error': 'Could not decode image'}), 400
+
+        with _track_in_flight():
+            detections = get_detector().detect(image)
+        detections = scale_detections(detections, scale)
+        # Formatting every detection list is itself costly at high QPS; log a sample.
+        sample_rate = float(current_app.config.get('DETECTION_LOG_SAMPLE_RATE', 0))
+        if sample_rate > 0 and random.random() < sample_rate:
+            logger.info(f"Detections: {detections}")
+
+        mimetype = request.accept_mimetypes.best_match(('application/json',) + compact.mimetypes())
+        if mimetype not in (None, 'application/json'):
+            body = compact.encode(detections, get_detector().label_ids, mimetype)
+            return Response(body, mimetype=mimetype, headers={'X-Detection-Schema': compact_schema()['version']})
         return jsonify({'detections': detections})
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Image larger than {limit} bytes'}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def video_jobs() -> VideoJobStore:
+    store = current_app.extensions.get('video_jobs')
+    if store is None:
+        store = current_app.extensions.setdefault('video_jobs', VideoJobStore(
+            current_app.config.get('VIDEO_JOBS_DIR', os.path.join(current_app.instance_path, 'video_jobs')),
+            workers=int(current_app.config.get('VIDEO_JOB_WORKERS', 1))
+        ))
+    return store
+
+def _save_raw_body(path: str, limit: int):
+    # Streams to disk in chunks; reading the input directly applies this
+    # route's limit instead of the app-wide MAX_CONTENT_LENGTH.
+    stream = get_input_stream(request.environ, max_content_length=limit)
+    with open(path, 'wb') as f:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+
+@inference_bp.route('/video_jobs', methods=['POST'])
+def create_video_job():
+    """
+    Queue an uploaded video for offline analysis.
+
+    The video is either the raw request body (video/* or
+    application/octet-stream, name in ?filename=) or the multipart 'video'
+    field; large recordings should use the raw body. ?stride=N analyses
+    every N-th frame, ?batch_size sets frames per detector call.
+    """
+    try:
+        stride = int(request.args.get('stride', 1))
+        batch_size = int(request.args.get('batch_size', current_app.config.get(
+            'VIDEO_JOB_BATCH_SIZE', DEFAULT_VIDEO_JOB_BATCH_SIZE)))
+        if not 1 <= stride <= 1000:
+            raise BadRequest(description='stride must be between 1 and 1000')
+        if not 1 <= batch_size <= MAX_VIDEO_JOB_BATCH_SIZE:
+            raise BadRequest(description=f'batch_size must be between 1 and {MAX_VIDEO_JOB_BATCH_SIZE}')
+
+        limit = int(current_app.config.get('VIDEO_JOB_MAX_UPLOAD_BYTES', DEFAULT_VIDEO_JOB_MAX_UPLOAD_BYTES))
+        if request.mimetype == 'multipart/form-data':
+            video = request.files.get('video')
+            if video is None:
+                raise BadRequest(description='No video provided')
+            write_input, filename = video.save, video.filename
+        elif request.mimetype.startswith('video/') or request.mimetype == 'application/octet-stream':
+            filename = request.args.get('filename') or 'upload' + (mimetypes.guess_extension(request.mimetype) or '')
+            write_input = lambda path: _save_raw_body(path, limit)
+        else:
+            raise BadRequest(description='No video provided')
+
+        store = video_jobs()
+        job = store.create(write_input, filename, stride, batch_size)
+        store.submit(job['job_id'], get_detector)
+        return jsonify(job), 202, {'Location': url_for('inference.get_video_job', job_id=job['job_id'])}
+    except ValueError:
+        return jsonify({'error': 'stride and batch_size must be integers'}), 400
+    except BadRequest as e:
+        return jsonify({'error': e.description}), 400
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Video too large'}), 413
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@inference_bp.route('/video_jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    job = video_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@inference_bp.route('/video_jobs/<job_id>/result', methods=['GET'])
+def get_video_job_result(job_id):
+    """
+    Download a finished job's detections as NPZ.
+
+    One entry per detection in the columns frame, time_ms, class_id,
+    confidence, bbox (N x 4, int16), depth, sim_depth_x, sim_depth_y,
+    sim_depth_gradient (float16) and direction (index into directions);
+    labels maps class_id to names.
+    """
+    store = video_jobs()
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f"Job is {job['status']}", 'job': job}), 409
+    return send_file(
+        store.result_path(job_id),
+        mimetype='application/octet-stream',
+        as_attachment=True,
+        download_name=f'{job_id}.npz'
+    )
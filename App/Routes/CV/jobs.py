@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STATUS_FILE = 'status.json'
+RESULT_FILE = 'detections.npz'
+DIRECTIONS = ('KIRI', 'KANAN')
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def _write_json(path, data):
+    # Readers in other processes must never see a half-written file.
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class _Columns:
+    """Per-detection columns of a video analysis, grown batch by batch."""
+
+    def __init__(self, label_ids):
+        self.label_ids = label_ids
+        self.frame = []
+        self.class_id = []
+        self.confidence = []
+        self.bbox = []
+        self.depth = []
+        self.sim_depth_x = []
+        self.sim_depth_y = []
+        self.sim_depth_gradient = []
+        self.direction = []
+
+    def __len__(self):
+        return len(self.frame)
+
+    def extend(self, frame_index, detections):
+        for detection in detections:
+            self.frame.append(frame_index)
+            self.class_id.append(self.label_ids.get(detection['label'], -1))
+            self.confidence.append(detection['confidence'])
+            self.bbox.append(detection['bbox'])
+            self.depth.append(detection['depth'])
+            self.sim_depth_x.append(detection['sim_depth_x'])
+            self.sim_depth_y.append(detection['sim_depth_y'])
+            self.sim_depth_gradient.append(detection['sim_depth_gradient'])
+            self.direction.append(DIRECTIONS.index(detection['direction']))
+
+    def save(self, path, labels, fps):
+        frame = np.asarray(self.frame, dtype=np.int32)
+        np.savez_compressed(
+            path,
+            frame=frame,
+            time_ms=(frame * (1000.0 / fps) if fps else np.zeros(len(frame))).astype(np.float32),
+            class_id=np.asarray(self.class_id, dtype=np.int16),
+            confidence=np.asarray(self.confidence, dtype=np.float32),
+            bbox=np.asarray(self.bbox, dtype=np.int16).reshape(-1, 4),
+            depth=np.asarray(self.depth, dtype=np.float32),
+            sim_depth_x=np.asarray(self.sim_depth_x, dtype=np.float16),
+            sim_depth_y=np.asarray(self.sim_depth_y, dtype=np.float16),
+            sim_depth_gradient=np.asarray(self.sim_depth_gradient, dtype=np.float16),
+            direction=np.asarray(self.direction, dtype=np.int8),
+            labels=np.asarray(labels),
+            directions=np.asarray(DIRECTIONS),
+        )
+
+
+def analyse_video(path, detector, stride=1, batch_size=8, on_progress=None):
+    """
+    Run detection over a video file as fast as the detector allows.
+
+    Frames skipped by stride are only grabbed, not decoded, and nothing is
+    drawn. Kept frames are sent to the detector batch_size at a time.
+
+    Args:
+        path (str): Video file
+        detector (ObjectDetector): Initialized detector
+        stride (int): Analyse every stride-th frame
+        batch_size (int): Frames per detector call
+        on_progress (callable, optional): Called as on_progress(frames_read, frames_analysed, detections)
+
+    Returns:
+        tuple: (_Columns, fps of the source video, frames read)
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError('Could not open video')
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    columns = _Columns(detector.label_ids)
+    frames, indices = [], []
+    frames_read = frames_analysed = 0
+
+    def flush():
+        nonlocal frames_analysed
+        if not frames:
+            return
+        for frame_index, detections in zip(indices, detector.detect_batch(frames)):
+            columns.extend(frame_index, detections)
+        frames_analysed += len(frames)
+        frames.clear()
+        indices.clear()
+        if on_progress is not None:
+            on_progress(frames_read, frames_analysed, len(columns))
+
+    try:
+        while True:
+            if frames_read % stride:
+                if not cap.grab():
+                    break
+            else:
+                success, frame = cap.read()
+                if not success:
+                    break
+                frames.append(frame)
+                indices.append(frames_read)
+            frames_read += 1
+            if len(frames) >= batch_size:
+                flush()
+        flush()
+    finally:
+        cap.release()
+    return columns, fps, frames_read
+
+
+class VideoJobStore:
+    """
+    Offline video-analysis jobs, one directory per job under root.
+
+    A job's status is a JSON file rewritten atomically as it progresses, so
+    every worker process on the host can report on jobs run by another.
+    Jobs run on a small thread pool created on first use, so each
+    pre-forked worker gets its own.
+    """
+
+    def __init__(self, root, workers=1):
+        self.root = root
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, job_id, name):
+        return os.path.join(self.root, job_id, name)
+
+    def create(self, write_input, filename, stride, batch_size):
+        """
+        Store an uploaded video and record a queued job for it.
+
+        Args:
+            write_input (callable): Writes the upload to the path it is given
+            filename (str): Original file name, for its extension
+            stride (int): Analyse every stride-th frame
+            batch_size (int): Frames per detector call
+
+        Returns:
+            dict: Job status
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.root, job_id))
+        extension = os.path.splitext(filename or '')[1].lower() or '.mp4'
+        input_path = self._path(job_id, f'input{extension}')
+        try:
+            write_input(input_path)
+        except BaseException:
+            shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+            raise
+
+        status = {
+            'job_id': job_id,
+            'status': 'queued',
+            'input': os.path.basename(input_path),
+            'input_bytes': os.path.getsize(input_path),
+            'stride': stride,
+            'batch_size': batch_size,
+            'frames_total': None,
+            'frames_read': 0,
+            'frames_analysed': 0,
+            'detections': 0,
+            'progress': 0.0,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None,
+        }
+        _write_json(self._path(job_id, STATUS_FILE), status)
+        return status
+
+    def submit(self, job_id, detector_factory):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='video-job')
+        self._executor.submit(self._run, job_id, detector_factory)
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict or None: Job status, None if there is no such job
+        """
+        if not JOB_ID_PATTERN.fullmatch(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id, STATUS_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def result_path(self, job_id):
+        return self._path(job_id, RESULT_FILE)
+
+    def _save(self, status):
+        _write_json(self._path(status['job_id'], STATUS_FILE), status)
+
+    def _run(self, job_id, detector_factory):
+        status = self.get(job_id)
+        status.update(status='running', started_at=time.time())
+        self._save(status)
+        input_path = self._path(job_id, status['input'])
+        try:
+            cap = cv2.VideoCapture(input_path)
+            frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+            cap.release()
+            status['frames_total'] = frames_total
+
+            def on_progress(frames_read, frames_analysed, detections):
+                status.update(frames_read=frames_read, frames_analysed=frames_analysed, detections=detections)
+                if frames_total:
+                    status['progress'] = round(min(frames_read / frames_total, 1.0), 4)
+                self._save(status)
+
+            detector = detector_factory()
+            columns, fps, frames_read = analyse_video(
+                input_path, detector, status['stride'], status['batch_size'], on_progress
+            )
+            labels = [detector.yolo_model.names[i] for i in sorted(detector.yolo_model.names)]
+            columns.save(self.result_path(job_id), labels, fps)
+
+            counts = np.bincount(np.asarray(columns.class_id, dtype=np.int64) + 1, minlength=len(labels) + 1)[1:]
+            elapsed = time.time() - status['started_at']
+            status.update(
+                status='done',
+                frames_read=frames_read,
+                detections=len(columns),
+                progress=1.0,
+                source_fps=fps,
+                analysis_fps=round(status['frames_analysed'] / elapsed, 2) if elapsed else None,
+                summary={label: int(count) for label, count in zip(labels, counts) if count},
+            )
+        except Exception as e:
+            logger.error(f"Video job {job_id} failed: {str(e)}")
+            status.update(status='failed', error=str(e))
+        finally:
+            status['finished_at'] = time.time()
+            self._save(status)
+            # The NPZ is the product; the upload is not kept around.
+            try:
+                os.remove(input_path)
+            except OSError:
+                pass
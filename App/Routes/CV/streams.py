@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import cv2
+from ...Utils.Metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POOL_BATCH_SIZE = REGISTRY.histogram(
+    'inference_pool_batch_size', 'Frames per detector call in the shared stream inference pool.',
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+POOL_DROPPED_FRAMES = REGISTRY.counter(
+    'inference_pool_dropped_frames_total', 'Frames replaced by a newer one before inference.', ('source',)
+)
+STREAM_SUBSCRIBERS = REGISTRY.gauge('video_stream_subscribers', 'Clients watching a video source.', ('source',))
+
+
+def configured_sources(config):
+    """
+    Named video sources from config.
+
+    Config.sources maps names to a camera index or a file/stream URL; without
+    it the single camera_id / video_path source is served as 'default'.
+
+    Returns:
+        OrderedDict: name -> cv2.VideoCapture argument
+    """
+    if config.sources:
+        sources = OrderedDict()
+        for name, target in config.sources.items():
+            sources[str(name)] = int(target) if str(target).isdigit() else target
+        return sources
+    return OrderedDict(default=config.camera_id if config.use_camera else config.video_path)
+
+
+class InferencePool:
+    """
+    One detector shared by every video source, batching across sources.
+
+    Each source has at most one frame waiting; a newer frame replaces it
+    (live video only needs the latest) but keeps its place in the queue.
+    The worker takes waiting frames oldest source first, up to max_batch
+    per detector call, so every source gets a turn regardless of its frame
+    rate and adding a camera grows batches rather than detectors.
+    """
+
+    def __init__(self, detector_factory, max_batch=4):
+        self.detector_factory = detector_factory
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()
+        self._thread = None
+
+    def submit(self, source, frame, callback):
+        """
+        Queue frame for inference; callback(frame, detections) runs on the
+        pool thread, with detections None if inference failed.
+        """
+        with self._cond:
+            if source in self._pending:
+                POOL_DROPPED_FRAMES.inc(source=source)
+            self._pending[source] = (frame, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='inference-pool', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _take_batch(self, limit):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            batch = []
+            while self._pending and len(batch) < limit:
+                batch.append(self._pending.popitem(last=False)[1])
+            return batch
+
+    def _work(self):
+        detector, limit = None, self.max_batch
+        while True:
+            batch = self._take_batch(limit)
+            frames = [frame for frame, _ in batch]
+            try:
+                if detector is None:
+                    detector = self.detector_factory()
+                    # A static-batch model runs a bigger batch frame by frame anyway;
+                    # leaving the rest queued lets newer frames replace them.
+                    limit = min(self.max_batch, getattr(detector, 'yolo_batch', 0) or self.max_batch)
+                results = detector.detect_batch(frames)
+            except Exception as e:
+                logger.error(f"Stream inference failed: {str(e)}")
+                results = [None] * len(frames)
+            POOL_BATCH_SIZE.observe(len(frames))
+            for (frame, callback), detections in zip(batch, results):
+                callback(frame, detections)
+
+
+class SourceStream:
+    """
+    Capture thread and MJPEG fan-out for one video source.
+
+    The thread runs while someone is watching (plus idle_timeout seconds),
+    feeds frames to the shared pool and renders the latest result it got
+    back, so inference never waits on drawing or JPEG encoding.
+    """
+
+    def __init__(self, name, target, pool, render, idle_timeout=10.0):
+        self.name = name
+        self.target = target
+        self.pool = pool
+        self.render = render
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._thread = None
+        self._subscribers = 0
+        self._jpeg = None
+        self._sequence = 0
+        self._result = None
+        self._running = False
+        self._failed = False
+        self.error = None
+        self.fps = 0.0
+
+    def _on_result(self, frame, detections):
+        with self._cond:
+            if detections is None:
+                self._failed = True
+            else:
+                self._result = (frame, detections)
+
+    def _take_result(self):
+        with self._cond:
+            result, self._result = self._result, None
+            return result
+
+    def _publish(self, jpeg):
+        with self._cond:
+            self._jpeg = jpeg
+            self._sequence += 1
+            self._cond.notify_all()
+
+    def _capture(self):
+        cap = cv2.VideoCapture(self.target)
+        if not cap.isOpened():
+            logger.error(f"Failed to open source {self.name}: {self.target}")
+            self._stop()
+            return
+        # Files are paced to their frame rate; cameras block on read.
+        interval = 0.0 if isinstance(self.target, int) else 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0)
+        idle_since = None
+        rendered, fps_started = 0, time.monotonic()
+        stopped = False
+        try:
+            while True:
+                with self._cond:
+                    if self._failed:
+                        # Ending the stream lets viewers see the failure and reconnect.
+                        self.error = 'Inference failed'
+                        logger.error(f"Stopping source {self.name}: inference failed")
+                        break
+                    if self._subscribers == 0:
+                        idle_since = idle_since or time.monotonic()
+                        if time.monotonic() - idle_since > self.idle_timeout:
+                            # Decided under the lock so a new viewer either keeps this thread or starts another
+                            self._running, self._thread, stopped = False, None, True
+                            break
+                    else:
+                        idle_since = None
+
+                started = time.monotonic()
+                success, frame = cap.read()
+                if not success:
+                    logger.info(f"Source {self.name} finished")
+                    break
+                self.pool.submit(self.name, frame, self._on_result)
+
+                result = self._take_result()
+                if result is not None:
+                    self._publish(self.render(*result, self.fps))
+                    rendered += 1
+                    elapsed = time.monotonic() - fps_started
+                    if elapsed > 1:
+                        self.fps = rendered / elapsed
+                        rendered, fps_started = 0, time.monotonic()
+
+                if interval:
+                    time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except Exception as e:
+            logger.error(f"Error in source {self.name}: {str(e)}")
+        finally:
+            cap.release()
+            if not stopped:
+                self._stop()
+
+    def _stop(self):
+        with self._cond:
+            self._running = False
+            self._thread = None
+            self._cond.notify_all()
+
+    def _ensure_running(self):
+        if self._thread is None:
+            self._running, self._failed, self.error = True, False, None
+            self._thread = threading.Thread(target=self._capture, name=f'capture-{self.name}', daemon=True)
+            self._thread.start()
+
+    def frames(self):
+        """Yield multipart MJPEG chunks until the source ends or the client leaves."""
+        with self._cond:
+            self._subscribers += 1
+            self._ensure_running()
+        STREAM_SUBSCRIBERS.inc(source=self.name)
+        seen = self._sequence
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._sequence != seen or not self._running, timeout=5.0)
+                    if self._sequence == seen:
+                        if not self._running:
+                            return
+                        continue
+                    seen, jpeg = self._sequence, self._jpeg
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+            STREAM_SUBSCRIBERS.dec(source=self.name)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'name': self.name,
+                'running': self._running,
+                'subscribers': self._subscribers,
+                'fps': round(self.fps, 2),
+                'error': self.error,
+            }
+
+
+class StreamManager:
+    """Named SourceStreams sharing one InferencePool."""
+
+    def __init__(self, sources, pool, render, idle_timeout=10.0):
+        self.streams = OrderedDict(
+            (name, SourceStream(name, target, pool, render, idle_timeout)) for name, target in sources.items()
+        )
+
+    def get(self, name):
+        return self.streams.get(name)
+
+    def default(self):
+        return next(iter(self.streams.values()))
+
+    def stats(self):
+        return [stream.stats() for stream in self.streams.values()]
@@ -1,13 +1,23 @@
-from flask import Blueprint, request, session
-from flask_sqlalchemy import SQLAlchemy
+import json
+from datetime import datetime
+from flask import Blueprint, request, session, Response, stream_with_context
 from marshmallow import ValidationError
+import numpy as np
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from ..Models.Favorite import Favorite
+from ..Models.User import User, get_version, bump_version
 from .favoriteShema import FavoriteSchema
-from ...Utils.Response import base_response
+from ..Models.Database import db
+from ...Utils.Response import json_response
+from ...Utils.ETag import make_etag, etag_header, not_modified
+from ...Utils.Geo import geohash_encode, geohash_cover, haversine_distance
 from werkzeug.exceptions import NotFound, Unauthorized, BadRequest
 
 favorites_bp = Blueprint('favorites', __name__, url_prefix='/favorites')
-db = SQLAlchemy()
+
+MAX_BULK_FAVORITES = 1000
+EXPORT_BATCH_SIZE = 500
 
 def require_auth():
     if 'user_id' not in session:
@@ -20,7 +30,7 @@ def add_favorite():
         require_auth()
         user_id = session['user_id']
         data = request.get_json()
-        data['user_id'] = user_id  # Enforce user_id from session
+        data['user_id'] = str(user_id)  # Enforce user_id from session
         schema = FavoriteSchema()
         favorite_data = schema.load(data)
 
@@ -36,13 +46,15 @@ def add_favorite():
             name=favorite_data['name'],
             latitude=favorite_data['latitude'],
             longitude=favorite_data['longitude'],
-            tags=str(favorite_data.get('tags', {})),
+            geohash=geohash_encode(favorite_data['latitude'], favorite_data['longitude']),
+            tags=favorite_data.get('tags') or {},
             notes=favorite_data.get('notes')
         )
         db.session.add(favorite)
+        bump_version(user_id, User.favorites_version)
         db.session.commit()
 
-        return base_response(
+        return json_response(
             code=201,
             status='success',
             message='Favorite added successfully',
@@ -50,14 +62,14 @@ def add_favorite():
         )
 
     except ValidationError as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Validation error',
             error=e.messages
         )
     except BadRequest as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message=str(e),
@@ -65,7 +77,7 @@ def add_favorite():
         )
     except Exception as e:
         db.session.rollback()
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
@@ -77,17 +89,23 @@ def get_favorites():
     try:
         require_auth()
         user_id = session['user_id']
+        etag = make_etag('favorites', user_id, get_version(user_id, User.favorites_version))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
         favorites = Favorite.query.filter_by(user_id=user_id).all()
         schema = FavoriteSchema(many=True)
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Favorites retrieved successfully',
-            data={'favorites': schema.dump(favorites), 'count': len(favorites)}
+            data={'favorites': schema.dump(favorites), 'count': len(favorites)},
+            headers=etag_header(etag)
         )
 
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
@@ -104,15 +122,16 @@ def remove_favorite(place_id):
             raise NotFound(description='Favorite not found')
 
         db.session.delete(favorite)
+        bump_version(user_id, User.favorites_version)
         db.session.commit()
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Favorite removed successfully'
         )
 
     except NotFound as e:
-        return base_response(
+        return json_response(
             code=404,
             status='error',
             message=str(e),
@@ -120,9 +139,205 @@ def remove_favorite(place_id):
         )
     except Exception as e:
         db.session.rollback()
-        return base_response(
+        return json_response(
+            code=500,
+            status='error',
+            message='Internal server error',
+            error=str(e)
+        )
+
+def insert_ignore_duplicates(rows):
+    """
+    Insert favorites in one statement, skipping rows that hit unique_user_place.
+
+    Returns:
+        int: Number of rows actually inserted
+    """
+    dialect = db.session.get_bind().dialect.name
+    table = Favorite.__table__
+    if dialect == 'sqlite':
+        stmt = sqlite.insert(table).on_conflict_do_nothing(index_elements=['user_id', 'place_id'])
+    elif dialect == 'postgresql':
+        stmt = postgresql.insert(table).on_conflict_do_nothing(constraint='unique_user_place')
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table).prefix_with('IGNORE')
+    else:
+        existing = set(db.session.scalars(
+            select(Favorite.place_id).where(
+                Favorite.user_id == rows[0]['user_id'],
+                Favorite.place_id.in_([row['place_id'] for row in rows])
+            )
+        ))
+        rows = [row for row in rows if row['place_id'] not in existing]
+        if not rows:
+            return 0
+        stmt = insert(table)
+    return db.session.execute(stmt, rows).rowcount
+
+@favorites_bp.route('/bulk', methods=['POST'])
+def add_favorites_bulk():
+    try:
+        require_auth()
+        user_id = session['user_id']
+        data = request.get_json()
+        items = data.get('favorites') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            raise BadRequest(description='Favorites must be a non-empty list')
+        if len(items) > MAX_BULK_FAVORITES:
+            raise BadRequest(description=f'At most {MAX_BULK_FAVORITES} favorites per request')
+
+        # user_id comes from the session, so it is checked once rather than per row
+        schema = FavoriteSchema(many=True, exclude=('user_id',))
+        favorites_data = schema.load(items)
+        if not db.session.get(User, user_id):
+            raise BadRequest(description='User does not exist')
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                'user_id': str(user_id),
+                'place_id': favorite['place_id'],
+                'name': favorite['name'],
+                'latitude': favorite['latitude'],
+                'longitude': favorite['longitude'],
+                'geohash': geohash_encode(favorite['latitude'], favorite['longitude']),
+                'tags': favorite.get('tags') or {},
+                'notes': favorite.get('notes'),
+                'created_at': now
+            }
+            for favorite in favorites_data
+        ]
+        inserted = insert_ignore_duplicates(rows)
+        if inserted:
+            bump_version(user_id, User.favorites_version)
+        db.session.commit()
+
+        return json_response(
+            code=201,
+            status='success',
+            message='Favorites imported successfully',
+            data={'received': len(rows), 'inserted': inserted, 'skipped': len(rows) - inserted}
+        )
+
+    except ValidationError as e:
+        return json_response(
+            code=400,
+            status='error',
+            message='Validation error',
+            error=e.messages
+        )
+    except BadRequest as e:
+        return json_response(
+            code=400,
+            status='error',
+            message=str(e),
+            error={'favorite': str(e)}
+        )
+    except Exception as e:
+        db.session.rollback()
+        return json_response(
+            code=500,
+            status='error',
+            message='Internal server error',
+            error=str(e)
+        )
+
+@favorites_bp.route('/export', methods=['GET'])
+def export_favorites():
+    # Only the setup can fail with a JSON error; once streaming starts the status is sent.
+    try:
+        require_auth()
+        user_id = session['user_id']
+    except (KeyError, Unauthorized):
+        return json_response(
+            code=401,
+            status='error',
+            message='Authentication required'
+        )
+    except Exception as e:
+        return json_response(
+            code=500,
+            status='error',
+            message='Internal server error',
+            error=str(e)
+        )
+    columns = (Favorite.id, Favorite.place_id, Favorite.name, Favorite.latitude,
+               Favorite.longitude, Favorite.tags, Favorite.notes, Favorite.created_at)
+    query = select(*columns).where(Favorite.user_id == user_id).order_by(Favorite.id)
+
+    def generate():
+        rows = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in rows:
+            yield json.dumps({
+                'id': row.id,
+                'user_id': str(user_id),
+                'place_id': row.place_id,
+                'name': row.name,
+                'latitude': row.latitude,
+                'longitude': row.longitude,
+                'tags': row.tags,
+                'notes': row.notes,
+                'created_at': row.created_at.isoformat() if row.created_at else None
+            }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@favorites_bp.route('/nearby', methods=['GET'])
+def get_nearby_favorites():
+    try:
+        require_auth()
+        user_id = session['user_id']
+        lat = float(request.args.get('lat'))
+        lon = float(request.args.get('lon'))
+        radius = float(request.args.get('radius', 1000))
+        if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+            raise BadRequest(description='Invalid latitude or longitude')
+        if radius <= 0 or radius > 50000:
+            raise BadRequest(description='Radius must be between 0 and 50000 meters')
+
+        # Range scans on (user_id, geohash); '{' sorts right after 'z'
+        prefix_ranges = [
+            and_(Favorite.geohash >= prefix, Favorite.geohash < prefix + '{')
+            for prefix in geohash_cover(lat, lon, radius)
+        ]
+        candidates = Favorite.query.filter(Favorite.user_id == user_id, or_(*prefix_ranges)).all()
+
+        lats = np.fromiter((f.latitude for f in candidates), dtype=np.float64, count=len(candidates))
+        lons = np.fromiter((f.longitude for f in candidates), dtype=np.float64, count=len(candidates))
+        distances = haversine_distance(lat, lon, lats, lons)
+        order = [i for i in np.argsort(distances, kind='stable').tolist() if distances[i] <= radius]
+
+        schema = FavoriteSchema(many=True)
+        favorites = schema.dump([candidates[i] for i in order])
+        for favorite, i in zip(favorites, order):
+            favorite['distance'] = round(float(distances[i]), 1)
+
+        return json_response(
+            code=200,
+            status='success',
+            message='Favorites retrieved successfully',
+            data={'favorites': favorites, 'count': len(favorites)}
+        )
+
+    except (TypeError, ValueError):
+        return json_response(
+            code=400,
+            status='error',
+            message='Invalid input parameters',
+            error={'parameters': 'Invalid format'}
+        )
+    except BadRequest as e:
+        return json_response(
+            code=400,
+            status='error',
+            message=str(e),
+            error={'parameters': str(e)}
+        )
+    except Exception as e:
+        db.session.rollback()
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
-        )
\ No newline at end of file
+        )
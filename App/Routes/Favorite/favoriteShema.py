@@ -13,12 +13,12 @@ class FavoriteSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
 
     @validates('user_id')
-    def validate_user_id(self, Conan, value):
+    def validate_user_id(self, value, **kwargs):
         if not User.query.get(value):
             raise ValidationError('User does not exist.')
 
     @validates('tags')
-    def validate_tags(self, value):
+    def validate_tags(self, value, **kwargs):
         if value is None:
             return
         if not isinstance(value, dict):
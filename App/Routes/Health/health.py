@@ -0,0 +1,50 @@
+from flask import Blueprint, current_app
+from ...Utils.Response import json_response
+
+health_bp = Blueprint('health', __name__)
+
+def register_readiness_check(app, name, check):
+    """
+    Add a check to /readyz.
+
+    Args:
+        app (Flask): Application to register the check on
+        name (str): Name reported in the response
+        check (callable): Returns (ready, details)
+    """
+    app.extensions.setdefault('readiness_checks', {})[name] = check
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness only: the process is up and serving requests.
+    return json_response(
+        code=200,
+        status='success',
+        message='OK'
+    )
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    checks = {}
+    ready = True
+    for name, check in current_app.extensions.get('readiness_checks', {}).items():
+        try:
+            check_ready, details = check()
+        except Exception as e:
+            check_ready, details = False, {'error': str(e)}
+        checks[name] = {'ready': check_ready, **details}
+        ready = ready and check_ready
+
+    if not ready:
+        return json_response(
+            code=503,
+            status='error',
+            message='Not ready',
+            error=checks
+        )
+    return json_response(
+        code=200,
+        status='success',
+        message='Ready',
+        data=checks
+    )
@@ -0,0 +1,94 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Single SQLAlchemy instance shared by every model and blueprint.
+db = SQLAlchemy()
+
+DEFAULT_DB_CONFIG = {
+    'SQLALCHEMY_POOL_SIZE': 10,
+    'SQLALCHEMY_MAX_OVERFLOW': 20,
+    'SQLALCHEMY_POOL_TIMEOUT': 10,
+    'SQLALCHEMY_POOL_RECYCLE': 1800,
+    'SQLALCHEMY_POOL_PRE_PING': True,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+}
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the pool settings in config.
+
+    Args:
+        config (dict): Flask app config
+
+    Returns:
+        dict: Engine keyword arguments
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': str(config['SQLALCHEMY_POOL_PRE_PING']).lower() in ('1', 'true', 'yes')}
+
+    if url.get_backend_name() == 'sqlite':
+        # sqlite3 waits on a locked database itself; keep it in line with busy_timeout.
+        options['connect_args'] = {
+            'timeout': int(config['SQLITE_BUSY_TIMEOUT_MS']) / 1000,
+            'check_same_thread': False,
+        }
+        if _is_memory_sqlite(url):
+            return options
+
+    options.update({
+        'pool_size': int(config['SQLALCHEMY_POOL_SIZE']),
+        'max_overflow': int(config['SQLALCHEMY_MAX_OVERFLOW']),
+        'pool_timeout': int(config['SQLALCHEMY_POOL_TIMEOUT']),
+        'pool_recycle': int(config['SQLALCHEMY_POOL_RECYCLE']),
+    })
+    return options
+
+
+def _sqlite_pragmas(config):
+    pragmas = [
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if not _is_memory_sqlite(make_url(config['SQLALCHEMY_DATABASE_URI'])):
+        # WAL lets readers proceed while a writer holds the lock.
+        pragmas.insert(0, 'PRAGMA journal_mode=WAL')
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def init_db(app):
+    """
+    Bind the shared db to app with a tuned connection pool.
+
+    Pool and SQLite settings are read from app.config, falling back to
+    DEFAULT_DB_CONFIG. SQLite connections get WAL journaling,
+    synchronous=NORMAL, a busy timeout and memory-mapped reads.
+    """
+    for key, value in DEFAULT_DB_CONFIG.items():
+        app.config.setdefault(key, value)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    db.init_app(app)
+
+    if make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        with app.app_context():
+            event.listen(db.engine, 'connect', _sqlite_pragmas(app.config))
+    return db
@@ -1,17 +1,68 @@
-from flask_sqlalchemy import SQLAlchemy
+import ast
+import json
 from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.types import TypeDecorator
+from .Database import db
+from ...Utils.Geo import geohash_encode
 
-db = SQLAlchemy()
+GEOHASH_BACKFILL_BATCH_SIZE = 500
+
+class JSONText(TypeDecorator):
+    """Dict stored as JSON text; rows saved before tags were JSON hold a Python repr."""
+    impl = db.Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return json.dumps(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return {}
+        try:
+            return json.loads(value)
+        except ValueError:
+            return ast.literal_eval(value)
 
 class Favorite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(50), db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.String(50), db.ForeignKey('users.user_id'), nullable=False)
     place_id = db.Column(db.String(50), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
-    tags = db.Column(db.Text, nullable=True)  # Store tags as JSON string
+    geohash = db.Column(db.String(12), nullable=True)
+    tags = db.Column(JSONText, nullable=True)  # Store tags as JSON string
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'place_id', name='unique_user_place'),)
\ No newline at end of file
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'place_id', name='unique_user_place'),
+        db.Index('ix_favorite_user_geohash', 'user_id', 'geohash'),
+    )
+
+def backfill_geohashes():
+    """
+    One-off migration for favorites saved before the geohash column existed.
+
+    Adds the column and its index if the table predates them, then fills in
+    missing geohashes in batches. Run at startup; once done it is a single
+    query that finds nothing.
+    """
+    table = Favorite.__table__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        return
+    if 'geohash' not in {column['name'] for column in inspector.get_columns(table.name)}:
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN geohash VARCHAR(12)'))
+    for index in table.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+    while True:
+        missing = Favorite.query.filter(Favorite.geohash.is_(None)).limit(GEOHASH_BACKFILL_BATCH_SIZE).all()
+        if not missing:
+            break
+        for favorite in missing:
+            favorite.geohash = geohash_encode(favorite.latitude, favorite.longitude)
+        db.session.commit()
@@ -1,7 +1,5 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-
-db = SQLAlchemy()
+from .Database import db
 
 class Settings(db.Model):
     __tablename__ = 'settings'
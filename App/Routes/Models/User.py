@@ -1,7 +1,9 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import inspect, text
+from .Database import db
 
-db = SQLAlchemy()
+# Added after the users table first shipped; see add_version_columns
+VERSION_COLUMNS = ('favorites_version', 'settings_version')
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,5 +14,32 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=True)
     google_id = db.Column(db.String(255), nullable=True, unique=True)
     profile_picture_url = db.Column(db.String(255), nullable=True)
+    # Bumped on every change so polling clients can be answered with 304
+    favorites_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    settings_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def get_version(user_id, column):
+    return db.session.query(column).filter(User.user_id == user_id).scalar() or 0
+
+def bump_version(user_id, column):
+    """Increment a per-user version counter inside the current transaction."""
+    User.query.filter(User.user_id == user_id).update({column: column + 1}, synchronize_session=False)
+
+def add_version_columns():
+    """
+    One-off migration for users tables created before the version counters.
+
+    create_all() leaves existing tables alone, so the columns are added here
+    at startup; once present it only inspects the table.
+    """
+    table = User.__table__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        return
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    with db.engine.begin() as conn:
+        for name in VERSION_COLUMNS:
+            if name not in existing:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0'))
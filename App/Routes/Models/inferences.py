@@ -2,12 +2,18 @@ import openvino as ov
 import numpy as np
 from PIL import Image
 import cv2
+import os
+from ...Utils.Precision import compile_properties, resolve_model
 
 class OpenVINOModel:
-    def __init__(self, xml_path, bin_path, device='CPU'):
+    def __init__(self, xml_path, bin_path, device='CPU', precision=None):
+        resolved_xml, precision = resolve_model(xml_path, precision)
+        if resolved_xml != xml_path:
+            xml_path, bin_path = resolved_xml, os.path.splitext(resolved_xml)[0] + '.bin'
         self.core = ov.Core()
         self.model = self.core.read_model(model=xml_path, weights=bin_path)
-        self.compiled_model = self.core.compile_model(self.model, device_name=device)
+        properties, self.precision = compile_properties(self.core, device, precision)
+        self.compiled_model = self.core.compile_model(self.model, device_name=device, config=properties)
         self.input_layer = self.compiled_model.input(0)
         self.output_layer = self.compiled_model.output(0)
         self.input_shape = self.input_layer.shape  # e.g., [1, 3, 768, 1024]
@@ -0,0 +1,161 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ...Utils.Geo import haversine_distance, point_to_segments, simplify
+from .upstream import fetch_places
+
+DEFAULT_CORRIDOR_WIDTH = 200  # meters on each side of the route
+DEFAULT_CORRIDOR_TAGS = ('amenity', 'shop', 'tourism', 'public_transport')
+
+logger = logging.getLogger(__name__)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='corridor-prefetch')
+
+
+class Corridor:
+    def __init__(self, lats, lons, width, tags, places):
+        self.lats = lats
+        self.lons = lons
+        self.width = width
+        self.tags = frozenset(tags)
+        self.places = places
+        self.place_lats = np.fromiter((p['latitude'] for p in places), dtype=np.float64, count=len(places))
+        self.place_lons = np.fromiter((p['longitude'] for p in places), dtype=np.float64, count=len(places))
+        self.created_at = time.monotonic()
+
+    def covers(self, lat, lon, radius):
+        distances, _ = point_to_segments(lat, lon, self.lats, self.lons)
+        return float(distances.min()) + radius <= self.width
+
+    def search(self, lat, lon, radius, tag_filters, name=None):
+        """
+        Answer an Overpass-style around query from the prefetched places.
+
+        Args:
+            lat (float): Search center latitude
+            lon (float): Search center longitude
+            radius (float): Search radius in meters
+            tag_filters (list): (key, value) pairs, value None meaning "has key"
+            name (re.Pattern, optional): Case-insensitive name pattern
+
+        Returns:
+            list: Matching place dictionaries
+        """
+        distances = haversine_distance(lat, lon, self.place_lats, self.place_lons)
+        results = []
+        for i in np.flatnonzero(distances <= radius).tolist():
+            place = self.places[i]
+            tags = place['tags']
+            if not all(key in tags and (value is None or tags[key] == value) for key, value in tag_filters):
+                continue
+            if name is not None and not name.search(tags.get('name', '')):
+                continue
+            results.append(place)
+        return results
+
+
+class CorridorCache:
+    """
+    Places prefetched along recently computed routes.
+
+    A query is answered locally only when its whole search circle lies inside
+    a live corridor and one of its tag keys was part of the prefetch, which
+    guarantees every node Overpass would have returned was fetched.
+    """
+
+    def __init__(self, ttl=15 * 60, max_corridors=256):
+        self.ttl = ttl
+        self.max_corridors = max_corridors
+        self._lock = threading.Lock()
+        self._corridors = []
+        self._hits = 0
+        self._misses = 0
+        self._prefetches = 0
+
+    def add(self, corridor):
+        with self._lock:
+            self._expire()
+            self._corridors.append(corridor)
+            del self._corridors[:-self.max_corridors]
+            self._prefetches += 1
+
+    def search(self, lat, lon, radius, tag_filters, name=''):
+        """
+        Returns:
+            list or None: Matching places, or None when no corridor can answer
+        """
+        pattern = None
+        if name:
+            try:
+                pattern = re.compile(name, re.IGNORECASE)
+            except re.error:
+                return None
+
+        keys = {key for key, _ in tag_filters}
+        with self._lock:
+            self._expire()
+            corridors = list(self._corridors)
+        for corridor in reversed(corridors):
+            if keys & corridor.tags and corridor.covers(lat, lon, radius):
+                with self._lock:
+                    self._hits += 1
+                return corridor.search(lat, lon, radius, tag_filters, pattern)
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def _expire(self):
+        now = time.monotonic()
+        self._corridors = [c for c in self._corridors if now - c.created_at <= self.ttl]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'corridors': len(self._corridors),
+                'prefetches': self._prefetches,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+
+corridor_cache = CorridorCache()
+
+
+def build_corridor_query(lats, lons, width, tags):
+    polyline = ','.join(f'{lat:.5f},{lon:.5f}' for lat, lon in zip(lats.tolist(), lons.tolist()))
+    statements = ''.join(f'node["{tag}"](around:{width},{polyline});' for tag in tags)
+    return f'[out:json];({statements});out body;'
+
+
+def _prefetch(lats, lons, width, tags):
+    # The polyline sent upstream is simplified, so the part of the corridor
+    # that is guaranteed complete shrinks by the simplification tolerance.
+    tolerance = width / 4
+    keep = simplify(lats, lons, tolerance)
+    lats, lons = lats[keep], lons[keep]
+    places = fetch_places(build_corridor_query(lats, lons, width, tags))
+    corridor_cache.add(Corridor(lats, lons, width - tolerance, tags, places))
+
+
+def schedule_prefetch(coordinates, width=DEFAULT_CORRIDOR_WIDTH, tags=DEFAULT_CORRIDOR_TAGS):
+    """
+    Fetch places along a route in the background and keep them in the corridor cache.
+
+    Args:
+        coordinates (list): Route geometry as [lon, lat] pairs
+        width (float): Corridor half-width in meters
+        tags (iterable): OSM tag keys to prefetch
+    """
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 2 or not tags:
+        return None
+    future = _executor.submit(_prefetch, coords[:, 1].copy(), coords[:, 0].copy(), width, tuple(tags))
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.warning(f"Corridor prefetch failed: {future.exception()}")
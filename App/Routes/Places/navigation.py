@@ -0,0 +1,234 @@
+import secrets
+import threading
+import time
+from contextlib import ExitStack
+import numpy as np
+from ...Utils.Geo import haversine_distance, point_to_segments
+
+# Number of segments ahead of the last match that are searched on each update
+# before falling back to the whole route.
+SEARCH_WINDOW = 32
+
+
+class NavigationSession:
+    def __init__(self, session_id, coordinates, instructions, step_threshold=20, off_route_threshold=30):
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)  # [lon, lat]
+        if len(coords) < 2:
+            raise ValueError('Route geometry needs at least two points')
+
+        self.session_id = session_id
+        self.lons = coords[:, 0]
+        self.lats = coords[:, 1]
+        self.texts = [step['text'] for step in instructions]
+        steps = np.asarray([step['interval'] for step in instructions], dtype=np.float64).reshape(-1, 2)
+        self.step_lons = steps[:, 0]
+        self.step_lats = steps[:, 1]
+        self.step_threshold = step_threshold
+        self.off_route_threshold = off_route_threshold
+
+        segment_lengths = haversine_distance(self.lats[:-1], self.lons[:-1], self.lats[1:], self.lons[1:])
+        self.cumulative = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+
+        # Vertex where each maneuver happens, searched forward so the
+        # sequence stays monotonic on routes that pass the same point twice.
+        self.step_vertices = np.zeros(len(steps), dtype=np.int64)
+        start = 0
+        for i in range(len(steps)):
+            distances = haversine_distance(self.step_lats[i], self.step_lons[i], self.lats[start:], self.lons[start:])
+            start += int(np.argmin(distances))
+            self.step_vertices[i] = start
+
+        self.segment_index = 0
+        self.current_index = 0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def segment_count(self):
+        return len(self.lats) - 1
+
+    def _match(self, lat, lng):
+        lo = max(0, self.segment_index - 2)
+        hi = min(self.segment_count, self.segment_index + SEARCH_WINDOW)
+        distances, t = point_to_segments(lat, lng, self.lats[lo:hi + 1], self.lons[lo:hi + 1])
+        best = int(np.argmin(distances))
+        if distances[best] > self.off_route_threshold and (lo > 0 or hi < self.segment_count):
+            lo = 0
+            distances, t = point_to_segments(lat, lng, self.lats, self.lons)
+            best = int(np.argmin(distances))
+        return lo + best, float(distances[best]), float(t[best])
+
+    def update(self, lat, lng):
+        """
+        Snap a GPS position onto the route and advance the current step.
+
+        Args:
+            lat (float): User latitude
+            lng (float): User longitude
+
+        Returns:
+            dict: Current step state for the client
+        """
+        with self.lock:
+            self.updated_at = time.monotonic()
+            segment, distance_to_route, t = self._match(lat, lng)
+            off_route = distance_to_route > self.off_route_threshold
+
+            if off_route:
+                segment, t = self.segment_index, 0.0
+            else:
+                self.segment_index = segment
+                last = len(self.texts) - 1
+                while self.current_index < last and self.step_vertices[self.current_index + 1] <= segment:
+                    self.current_index += 1
+
+            distance_to_next = None
+            if self.current_index < len(self.texts) - 1:
+                next_index = self.current_index + 1
+                distance_to_next = float(haversine_distance(
+                    lat, lng, self.step_lats[next_index], self.step_lons[next_index]
+                ))
+                if distance_to_next < self.step_threshold:
+                    self.current_index = next_index
+                    distance_to_next = None
+                    if next_index < len(self.texts) - 1:
+                        distance_to_next = float(haversine_distance(
+                            lat, lng, self.step_lats[next_index + 1], self.step_lons[next_index + 1]
+                        ))
+
+            travelled = self.cumulative[segment] + t * (self.cumulative[segment + 1] - self.cumulative[segment])
+            instruction = self.texts[self.current_index] if self.current_index < len(self.texts) else 'Sampai di tujuan'
+
+            return {
+                'session_id': self.session_id,
+                'current_index': self.current_index,
+                'instruction': instruction,
+                'off_route': off_route,
+                'distance_to_route': round(distance_to_route, 1),
+                'distance_to_next_step': round(distance_to_next, 1) if distance_to_next is not None else None,
+                'distance_remaining': round(float(self.cumulative[-1] - travelled), 1),
+            }
+
+
+def batch_advance(sessions, lats, lngs, indices):
+    """
+    Advance many sessions by one GPS tick each in a single vectorized pass.
+
+    This mirrors the /current_step rule (move to the next step once the user
+    is within the step threshold of its maneuver point) without map-matching,
+    which keeps the per-user cost to a handful of array operations. Steps the
+    session has already passed by map-matched /position updates are skipped
+    first, as NavigationSession.update does.
+
+    Every session's lock is held from reading its state to writing the new
+    index, so a concurrent /position update is never lost.
+
+    Args:
+        sessions (list): NavigationSession for each update
+        lats (array-like): User latitudes
+        lngs (array-like): User longitudes
+        indices (list): Current step index for each update, None to use the session's
+
+    Returns:
+        list: (current_index, instruction, distance_to_next_step) per update
+    """
+    with ExitStack() as stack:
+        # Each distinct session locked once, in a fixed order so that
+        # concurrent batches cannot deadlock.
+        for session in sorted({id(s): s for s in sessions}.values(), key=lambda s: s.session_id):
+            stack.enter_context(session.lock)
+        return _advance_locked(sessions, lats, lngs, indices)
+
+
+def _advance_locked(sessions, lats, lngs, indices):
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    indices = np.fromiter(
+        (s.current_index if i is None else i for s, i in zip(sessions, indices)), dtype=np.int64, count=len(sessions)
+    )
+    step_counts = np.fromiter((len(s.texts) for s in sessions), dtype=np.int64, count=len(sessions))
+    indices = np.minimum(indices, step_counts - 1)
+    # Steps whose maneuver vertex lies at or before the matched segment are behind the user
+    passed = np.fromiter(
+        (np.searchsorted(s.step_vertices, s.segment_index, side='right') - 1 for s in sessions),
+        dtype=np.int64, count=len(sessions)
+    )
+    indices = np.maximum(indices, np.minimum(passed, step_counts - 1))
+
+    has_next = indices < step_counts - 1
+    next_indices = np.where(has_next, indices + 1, indices)
+    next_lats = np.fromiter((s.step_lats[i] for s, i in zip(sessions, next_indices)), dtype=np.float64, count=len(sessions))
+    next_lngs = np.fromiter((s.step_lons[i] for s, i in zip(sessions, next_indices)), dtype=np.float64, count=len(sessions))
+    thresholds = np.fromiter((s.step_threshold for s in sessions), dtype=np.float64, count=len(sessions))
+
+    distances = haversine_distance(lats, lngs, next_lats, next_lngs)
+    advanced = has_next & (distances < thresholds)
+    indices = np.where(advanced, next_indices, indices)
+
+    now = time.monotonic()
+    results = []
+    for session, index, distance, moved, pending in zip(sessions, indices.tolist(), distances.tolist(),
+                                                        advanced.tolist(), has_next.tolist()):
+        session.current_index = index
+        session.updated_at = now
+        results.append((index, session.texts[index], round(distance, 1) if pending and not moved else None))
+    return results
+
+
+class NavigationSessionStore:
+    """
+    In-process store of active navigation sessions.
+
+    Sessions expire after ttl seconds without a position update; when the
+    store is full the least recently updated session is dropped.
+    """
+
+    def __init__(self, ttl=2 * 60 * 60, max_sessions=10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def create(self, coordinates, instructions, **options):
+        session_id = secrets.token_urlsafe(12)
+        session = NavigationSession(session_id, coordinates, instructions, **options)
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.updated_at)
+                del self._sessions[oldest.session_id]
+            self._sessions[session_id] = session
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and time.monotonic() - session.updated_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            return session
+
+    def get_many(self, session_ids):
+        with self._lock:
+            now = time.monotonic()
+            return [
+                session if session is not None and now - session.updated_at <= self.ttl else None
+                for session in (self._sessions.get(session_id) for session_id in session_ids)
+            ]
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [sid for sid, s in self._sessions.items() if now - s.updated_at > self.ttl]
+        for sid in expired:
+            del self._sessions[sid]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+navigation_sessions = NavigationSessionStore()
@@ -1,11 +1,15 @@
-from flask import Blueprint, request, session
-from werkzeug.exceptions import BadRequest, Unauthorized
-from ...Utils.Response import base_response
-from .placeSchema import PlaceSchema
+from flask import Blueprint, request, session, current_app
+from werkzeug.exceptions import BadRequest, NotFound, Unauthorized
+from ...Utils.Response import json_response, compile_serializer
+from .placeSchema import Place
+from .upstream import fetch_places, fetch_route, normalize_coordinate, upstream_stats
+from .navigation import navigation_sessions, batch_advance
+from .corridor import corridor_cache, schedule_prefetch, DEFAULT_CORRIDOR_WIDTH, DEFAULT_CORRIDOR_TAGS
+from ...Utils.CircuitBreaker import CircuitOpenError
+from ...Utils.Geo import haversine_distance, simplify, encode_polyline
+import numpy as np
 import overpy
 import requests
-from marshmallow import Schema, fields, validate
-import math
 
 places_bp = Blueprint('places', __name__, url_prefix='/places')
 
@@ -15,22 +19,100 @@ def require_auth():
         return
         raise Unauthorized(description='Authentication required')
 
-# Define schema for directions response
-class RouteSchema(Schema):
-    distance = fields.Float(required=True)
-    time = fields.Integer(required=True)
-    instructions = fields.List(
-        fields.Dict(
-            keys=fields.Str(),
-            values=fields.Raw(),
-        ),
-    )
-    coordinates = fields.List(
-        fields.List(
-            fields.Float(),
-            validate=validate.Length(min=2, max=2),
-        ),
-    )
+GEOMETRY_FORMATS = {'geojson': None, 'polyline': 5, 'polyline6': 6}
+
+def build_route_geometry(coordinates, tolerance=0.0, geometry='geojson', precision=None):
+    """
+    Shrink a route geometry for the response.
+
+    Args:
+        coordinates (list): OSRM GeoJSON coordinates as [lon, lat] pairs
+        tolerance (float): Douglas-Peucker tolerance in meters, 0 keeps every point
+        geometry (str): 'geojson', 'polyline' (precision 5) or 'polyline6'
+        precision (int, optional): Decimal places kept for 'geojson' output
+
+    Returns:
+        dict: Either {'coordinates': [...]} or {'polyline': '...'}
+    """
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if tolerance > 0:
+        coords = coords[simplify(coords[:, 1], coords[:, 0], tolerance)]
+
+    if GEOMETRY_FORMATS[geometry] is not None:
+        return {'polyline': encode_polyline(coords[:, 1], coords[:, 0], GEOMETRY_FORMATS[geometry])}
+    if precision is not None:
+        coords = np.round(coords, precision)
+    return {'coordinates': coords.tolist()}
+
+def corridor_settings():
+    tags = current_app.config.get('PLACES_CORRIDOR_TAGS', DEFAULT_CORRIDOR_TAGS)
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    width = float(current_app.config.get('PLACES_CORRIDOR_WIDTH', DEFAULT_CORRIDOR_WIDTH))
+    return width, tags
+
+DEFAULT_PLACES_LIMIT = 50
+MAX_PLACES_LIMIT = 500
+
+def parse_page_args(args):
+    limit = int(args.get('limit', DEFAULT_PLACES_LIMIT))
+    offset = int(args.get('cursor', 0))
+    if limit < 1 or limit > MAX_PLACES_LIMIT:
+        raise BadRequest(description=f'Limit must be between 1 and {MAX_PLACES_LIMIT}')
+    if offset < 0:
+        raise BadRequest(description='Invalid cursor')
+
+    fields_arg = args.get('fields', '').strip()
+    if not fields_arg:
+        return limit, offset, None, None
+    requested = [field.strip() for field in fields_arg.split(',') if field.strip()]
+    tag_keys = [field[len('tags.'):] for field in requested if field.startswith('tags.')]
+    only = {field for field in requested if not field.startswith('tags.')}
+    if tag_keys:
+        only.add('tags')
+    unknown = only - set(Place.__annotations__)
+    if unknown:
+        raise BadRequest(description=f'Unknown fields: {", ".join(sorted(unknown))}')
+    return limit, offset, only, tag_keys or None
+
+def page_places(places, lat, lon, limit, offset, only=None, tag_keys=None):
+    """
+    Sort places by distance from (lat, lon) and serialize one page of them.
+
+    Args:
+        places (list): Place dictionaries (shared upstream results, not mutated)
+        lat (float): Reference latitude
+        lon (float): Reference longitude
+        limit (int): Page size
+        offset (int): Index of the first place of the page
+        only (set, optional): Place fields to include
+        tag_keys (list, optional): Tag keys kept when tags are included
+
+    Returns:
+        dict: Response data with places, count, total and next_cursor
+    """
+    lats = np.fromiter((p['latitude'] for p in places), dtype=np.float64, count=len(places))
+    lons = np.fromiter((p['longitude'] for p in places), dtype=np.float64, count=len(places))
+    distances = haversine_distance(lat, lon, lats, lons)
+    order = np.argsort(distances, kind='stable')[offset:offset + limit]
+
+    page = []
+    for i in order.tolist():
+        place = {**places[i], 'distance': round(float(distances[i]), 1)}
+        if tag_keys is not None:
+            tags = place['tags'] or {}
+            place['tags'] = {key: tags[key] for key in tag_keys if key in tags}
+        page.append(place)
+
+    serialize = compile_serializer(Place, tuple(sorted(only)) if only else None)
+    result = serialize(page)
+    next_offset = offset + limit
+    return {
+        'places': result,
+        'count': len(result),
+        'total': len(places),
+        'next_cursor': str(next_offset) if next_offset < len(places) else None
+    }
 
 # Existing /nearby endpoint (unchanged)
 @places_bp.route('/nearby', methods=['GET'])
@@ -49,8 +131,9 @@ def get_nearby_places():
             raise BadRequest(description='Radius must be between 100 and 10000 meters')
         if place_type.strip() == '':
             raise BadRequest(description='Place type cannot be empty')
+        limit, offset, only, tag_keys = parse_page_args(request.args)
 
-        api = overpy.Overpass()
+        lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
         name_filter = f'["name"~"{name}",i]' if name.strip() else ''
         query = f"""
             [out:json];
@@ -58,50 +141,47 @@ def get_nearby_places():
             out body;
         """
 
-        result = api.query(query)
-        places = [
-            {
-                'id': str(node.id),
-                'name': node.tags.get('name', 'Unknown'),
-                'latitude': float(node.lat),
-                'longitude': float(node.lon),
-                'tags': node.tags
-            }
-            for node in result.nodes
-        ]
+        places = corridor_cache.search(lat, lon, radius, [('amenity', place_type)], name.strip())
+        if places is None:
+            places = fetch_places(query)
 
-        schema = PlaceSchema(many=True)
-        result = schema.dump(places)
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Places retrieved successfully',
-            data={'places': result, 'count': len(result)}
+            data=page_places(places, lat, lon, limit, offset, only, tag_keys)
         )
 
     except ValueError:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Invalid input parameters',
             error={'parameters': 'Invalid format'}
         )
     except overpy.exception.OverPyException as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Overpass API error',
             error=str(e)
         )
+    except CircuitOpenError as e:
+        return json_response(
+            code=503,
+            status='error',
+            message='Overpass API temporarily unavailable',
+            error=str(e)
+        )
     except BadRequest as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message=str(e),
             error={'parameters': str(e)}
         )
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
@@ -123,17 +203,24 @@ def get_walking_directions():
         if not (-90 <= end_lat <= 90) or not (-180 <= end_lon <= 180):
             raise BadRequest(description='Invalid end latitude or longitude')
 
-        OSRM_URL = 'http://router.project-osrm.org/route/v1/foot'
-        coordinates = f'{start_lon},{start_lat};{end_lon},{end_lat}'
+        tolerance = float(request.args.get('simplify', 0))
+        geometry = request.args.get('geometry', 'geojson')
+        precision = request.args.get('precision')
+        precision = int(precision) if precision is not None else None
+        if tolerance < 0 or tolerance > 1000:
+            raise BadRequest(description='Simplify tolerance must be between 0 and 1000 meters')
+        if geometry not in GEOMETRY_FORMATS:
+            raise BadRequest(description='Geometry must be one of geojson, polyline, polyline6')
+        if precision is not None and not (0 <= precision <= 8):
+            raise BadRequest(description='Precision must be between 0 and 8')
+
         params = {
             'overview': 'full',
             'geometries': 'geojson',
             'steps': 'true'
         }
 
-        response = requests.get(f'{OSRM_URL}/{coordinates}', params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_route(start_lat, start_lon, end_lat, end_lon, params)
 
         if data.get('code') != 'Ok' or not data.get('routes'):
             raise BadRequest(description='No route found')
@@ -164,46 +251,67 @@ def get_walking_directions():
                     'interval': maneuver.get('location', [])  # [lon, lat]
                 })
 
+        coordinates = route_data['geometry']['coordinates']
         route = {
             'distance': route_data['distance'],
             'time': int(route_data['duration']),
             'instructions': instructions,
-            'coordinates': route_data['geometry']['coordinates']
+            **build_route_geometry(coordinates, tolerance, geometry, precision)
         }
 
-        schema = RouteSchema()
-        result = schema.dump(route)
+        response_data = {'route': route}
+
+        prefetch_default = str(current_app.config.get('PLACES_CORRIDOR_PREFETCH', False)).lower()
+        if request.args.get('prefetch', prefetch_default).lower() in ('1', 'true', 'yes'):
+            width, tags = corridor_settings()
+            schedule_prefetch(coordinates, width, tags)
 
-        return base_response(
+        if request.args.get('session', 'false').lower() in ('1', 'true', 'yes'):
+            nav_session = navigation_sessions.create(
+                coordinates,
+                instructions,
+                step_threshold=current_app.config.get('NAVIGATION_STEP_THRESHOLD', 20),
+                off_route_threshold=current_app.config.get('NAVIGATION_OFF_ROUTE_THRESHOLD', 30)
+            )
+            response_data['session_id'] = nav_session.session_id
+
+        return json_response(
             code=200,
             status='success',
             message='Rute berjalan berhasil diambil',
-            data={'route': result}
+            data=response_data
         )
 
     except ValueError:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Parameter masukan tidak valid',
             error={'parameters': 'Format tidak valid'}
         )
     except requests.exceptions.HTTPError as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Kesalahan layanan OSRM',
             error=str(e)
         )
+    except CircuitOpenError as e:
+        return json_response(
+            code=503,
+            status='error',
+            message='Layanan OSRM sedang tidak tersedia',
+            error=str(e)
+        )
     except BadRequest as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message=str(e),
             error={'parameters': str(e)}
         )
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
@@ -225,15 +333,6 @@ def get_current_step():
         if not isinstance(current_index, int) or current_index < 0:
             raise BadRequest(description='Invalid current index')
 
-        # Haversine distance calculation
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 6371000  # Earth radius in meters
-            phi1, phi2 = math.radians(lat1), math.radians(lat2)
-            delta_phi = math.radians(lat2 - lat1)
-            delta_lambda = math.radians(lon2 - lon1)
-            a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-            return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
         # Check distance to next step
         if current_index < len(steps) - 1:
             next_step = steps[current_index + 1]
@@ -247,7 +346,7 @@ def get_current_step():
 
         instruction = steps[current_index]['text'] if current_index < len(steps) else 'Sampai di tujuan'
 
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Current step retrieved successfully',
@@ -258,27 +357,169 @@ def get_current_step():
         )
 
     except ValueError:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Invalid input parameters',
             error={'parameters': 'Invalid format'}
         )
     except BadRequest as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message=str(e),
             error={'parameters': str(e)}
         )
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
         )
 
+# Batch /current_step for gateways that aggregate many users' GPS ticks
+@places_bp.route('/current_step/batch', methods=['POST'])
+def get_current_steps_batch():
+    try:
+        require_auth()
+        data = request.get_json()
+        updates = data.get('updates') if isinstance(data, dict) else None
+        if not isinstance(updates, list) or not updates:
+            raise BadRequest(description='Missing updates')
+
+        session_ids = [update['session_id'] for update in updates]
+        lats = [float(update['lat']) for update in updates]
+        lngs = [float(update['lng']) for update in updates]
+        for lat, lng in zip(lats, lngs):
+            if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+                raise BadRequest(description='Invalid latitude or longitude')
+        sessions = navigation_sessions.get_many(session_ids)
+
+        found = [i for i, nav_session in enumerate(sessions) if nav_session is not None]
+        indices = []
+        for i in found:
+            current_index = updates[i].get('current_index')
+            if current_index is not None and (not isinstance(current_index, int) or current_index < 0):
+                raise BadRequest(description='Invalid current index')
+            indices.append(current_index)
+
+        advanced = batch_advance(
+            [sessions[i] for i in found],
+            [lats[i] for i in found],
+            [lngs[i] for i in found],
+            indices
+        )
+
+        results = [
+            {'session_id': session_id, 'error': 'Navigation session not found'}
+            for session_id in session_ids
+        ]
+        for i, (current_index, instruction, distance) in zip(found, advanced):
+            results[i] = {
+                'session_id': session_ids[i],
+                'current_index': current_index,
+                'instruction': instruction,
+                'distance_to_next_step': distance
+            }
+
+        return json_response(
+            code=200,
+            status='success',
+            message='Current steps retrieved successfully',
+            data={'results': results, 'count': len(results)}
+        )
+
+    except (KeyError, TypeError, ValueError):
+        return json_response(
+            code=400,
+            status='error',
+            message='Invalid input parameters',
+            error={'parameters': 'Invalid format'}
+        )
+    except BadRequest as e:
+        return json_response(
+            code=400,
+            status='error',
+            message=str(e),
+            error={'parameters': str(e)}
+        )
+    except Exception as e:
+        return json_response(
+            code=500,
+            status='error',
+            message='Internal server error',
+            error=str(e)
+        )
+
+# Navigation session position update: only the position is sent per tick
+@places_bp.route('/navigation/<session_id>/position', methods=['POST'])
+def update_navigation_position(session_id):
+    try:
+        require_auth()
+        data = request.get_json()
+        if not data or 'lat' not in data or 'lng' not in data:
+            raise BadRequest(description='Missing user position')
+        lat = float(data['lat'])
+        lng = float(data['lng'])
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            raise BadRequest(description='Invalid latitude or longitude')
+
+        nav_session = navigation_sessions.get(session_id)
+        if nav_session is None:
+            raise NotFound(description='Navigation session not found')
+
+        return json_response(
+            code=200,
+            status='success',
+            message='Current step retrieved successfully',
+            data=nav_session.update(lat, lng)
+        )
+
+    except (TypeError, ValueError):
+        return json_response(
+            code=400,
+            status='error',
+            message='Invalid input parameters',
+            error={'parameters': 'Invalid format'}
+        )
+    except BadRequest as e:
+        return json_response(
+            code=400,
+            status='error',
+            message=str(e),
+            error={'parameters': str(e)}
+        )
+    except NotFound as e:
+        return json_response(
+            code=404,
+            status='error',
+            message=str(e),
+            error={'session': 'Not found'}
+        )
+    except Exception as e:
+        return json_response(
+            code=500,
+            status='error',
+            message='Internal server error',
+            error=str(e)
+        )
+
+@places_bp.route('/navigation/<session_id>', methods=['DELETE'])
+def end_navigation(session_id):
+    if not navigation_sessions.delete(session_id):
+        return json_response(
+            code=404,
+            status='error',
+            message='Navigation session not found',
+            error={'session': 'Not found'}
+        )
+    return json_response(
+        code=200,
+        status='success',
+        message='Navigation session ended successfully'
+    )
+
 # Existing /search endpoint (unchanged)
 @places_bp.route('/search', methods=['GET'])
 def search_places():
@@ -296,8 +537,9 @@ def search_places():
             raise BadRequest(description='Invalid latitude or longitude')
         if radius < 100 or radius > 10000:
             raise BadRequest(description='Radius must be between 100 and 10000 meters')
+        limit, offset, only, tag_keys = parse_page_args(request.args)
 
-        api = overpy.Overpass()
+        lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
         tag_filters = ''.join([f'["{tag.strip()}"]' for tag in tags if tag.strip()]) if tags else ''
         name_filter = f'["name"~"{query}",i]' if query else ''
         query_str = f"""
@@ -306,52 +548,59 @@ def search_places():
             out body;
         """
 
-        result = api.query(query_str)
-        places = [
-            {
-                'id': str(node.id),
-                'name': node.tags.get('name', 'Unknown'),
-                'latitude': float(node.lat),
-                'longitude': float(node.lon),
-                'tags': node.tags
-            }
-            for node in result.nodes
-        ]
+        tag_filters = [(tag.strip(), None) for tag in tags if tag.strip()]
+        places = corridor_cache.search(lat, lon, radius, tag_filters, query)
+        if places is None:
+            places = fetch_places(query_str)
 
-        schema = PlaceSchema(many=True)
-        result = schema.dump(places)
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Places retrieved successfully',
-            data={'places': result, 'count': len(result)}
+            data=page_places(places, lat, lon, limit, offset, only, tag_keys)
         )
 
     except ValueError:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Invalid input parameters',
             error={'parameters': 'Invalid format'}
         )
     except overpy.exception.OverPyException as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Overpass API error',
             error=str(e)
         )
+    except CircuitOpenError as e:
+        return json_response(
+            code=503,
+            status='error',
+            message='Overpass API temporarily unavailable',
+            error=str(e)
+        )
     except BadRequest as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message=str(e),
             error={'parameters': str(e)}
         )
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
         )
+
+@places_bp.route('/upstream/stats', methods=['GET'])
+def get_upstream_stats():
+    return json_response(
+        code=200,
+        status='success',
+        message='Upstream stats retrieved successfully',
+        data={**upstream_stats(), 'corridor': corridor_cache.stats()}
+    )
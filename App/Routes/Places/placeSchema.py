@@ -1,3 +1,4 @@
+from typing import TypedDict
 from marshmallow import Schema, fields, ValidationError, validates
 
 class PlaceSchema(Schema):
@@ -5,6 +6,7 @@ class PlaceSchema(Schema):
     name = fields.Str(required=True)
     latitude = fields.Float(required=True)
     longitude = fields.Float(required=True)
+    distance = fields.Float()
     tags = fields.Dict(keys=fields.Str(), values=fields.Str(), allow_none=True)
 
     @validates('tags')
@@ -12,4 +14,14 @@ class PlaceSchema(Schema):
         if value is None:
             return
         if not isinstance(value, dict):
-            raise ValidationError('Tags must be a dictionary')
\ No newline at end of file
+            raise ValidationError('Tags must be a dictionary')
+
+# Shapes of the records the places blueprint builds itself. They are
+# serialized with compile_serializer instead of a marshmallow dump.
+class Place(TypedDict):
+    id: str
+    name: str
+    latitude: float
+    longitude: float
+    distance: float
+    tags: dict
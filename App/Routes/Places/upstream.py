@@ -0,0 +1,255 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import overpy
+import requests
+from ...Utils.SingleFlight import SingleFlight
+from ...Utils.CircuitBreaker import CircuitBreaker, CircuitOpenError
+from ...Utils.Metrics import REGISTRY, record_stage
+
+# Both can point at local stand-ins (see loadtest/stubs.py).
+OSRM_URL = os.getenv('OSRM_URL', 'http://router.project-osrm.org/route/v1/foot')
+OVERPASS_URL = os.getenv('OVERPASS_URL') or overpy.Overpass.default_url
+OSRM_TIMEOUT = 10  # seconds
+OVERPASS_TIMEOUT = 25  # seconds
+
+# Coordinates are rounded to ~1 m before they become part of an upstream
+# query so that users standing next to each other share the same key.
+COORDINATE_PRECISION = 5
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_DURATION = REGISTRY.histogram(
+    'upstream_request_duration_seconds', 'Time spent in calls to upstream services.', ('upstream', 'outcome')
+)
+UPSTREAM_CACHE = REGISTRY.counter(
+    'upstream_cache_total', 'Upstream lookups by how they were answered.', ('upstream', 'result')
+)
+
+
+def _is_upstream_failure(error):
+    # A 4xx from OSRM (e.g. NoRoute) or a rejected Overpass query means the
+    # request was bad, not the service.
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    if isinstance(error, overpy.exception.OverpassBadRequest):
+        return False
+    return True
+
+
+class StaleCache:
+    """
+    Bounded LRU of upstream results with a fresh and a stale window.
+
+    Entries younger than fresh_ttl are served as is; entries younger than
+    stale_ttl are served immediately while a background refresh runs.
+    """
+
+    def __init__(self, fresh_ttl, stale_ttl, max_entries=1024):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (value, age) or (None, None) if missing or too old
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.stale_ttl:
+                del self._entries[key]
+                return None, None
+            self._entries.move_to_end(key)
+            return value, age
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class Upstream:
+    """
+    One upstream service: single-flight, circuit breaker and stale cache.
+    """
+
+    def __init__(self, name, fresh_ttl, stale_ttl, **breaker_options):
+        self.name = name
+        self.flight = SingleFlight(name)
+        self.breaker = CircuitBreaker(name, is_failure=_is_upstream_failure, **breaker_options)
+        self.cache = StaleCache(fresh_ttl, stale_ttl)
+        self._stale_hits = 0
+        self._fresh_hits = 0
+
+    def _load(self, key, fn, args):
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = self.breaker.call(fn, *args)
+            outcome = 'success'
+        except CircuitOpenError:
+            outcome = 'circuit_open'
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            UPSTREAM_DURATION.observe(seconds, upstream=self.name, outcome=outcome)
+            record_stage(f'upstream.{self.name}', seconds)
+        self.cache.set(key, result)
+        return result
+
+    def _refresh(self, key, fn, args):
+        try:
+            self.flight.do(key, self._load, key, fn, args)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.name} failed: {str(e)}")
+
+    def get(self, key, fn, *args):
+        """
+        Return the result of fn(*args), cached under key.
+
+        Raises:
+            CircuitOpenError: If the upstream is failing and nothing is cached
+        """
+        value, age = self.cache.get(key)
+        if value is not None:
+            if age <= self.cache.fresh_ttl:
+                self._fresh_hits += 1
+                UPSTREAM_CACHE.inc(upstream=self.name, result='fresh')
+                return value
+            self._stale_hits += 1
+            UPSTREAM_CACHE.inc(upstream=self.name, result='stale')
+            if key not in self.flight:
+                _refresh_executor.submit(self._refresh, key, fn, args)
+            return value
+        UPSTREAM_CACHE.inc(upstream=self.name, result='miss')
+        return self.flight.do(key, self._load, key, fn, args)
+
+    def stats(self):
+        return {
+            **self.flight.stats(),
+            'breaker': self.breaker.stats(),
+            'cache_entries': len(self.cache),
+            'fresh_hits': self._fresh_hits,
+            'stale_hits': self._stale_hits,
+        }
+
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='upstream-refresh')
+
+overpass = Upstream('overpass', fresh_ttl=5 * 60, stale_ttl=60 * 60, slow_call_threshold=15.0)
+osrm = Upstream('osrm', fresh_ttl=10 * 60, stale_ttl=60 * 60, slow_call_threshold=5.0)
+
+
+def normalize_coordinate(value):
+    return round(float(value), COORDINATE_PRECISION)
+
+
+def normalize_query(query):
+    return ' '.join(query.split())
+
+
+def _parse_overpass(api, query, response):
+    # Mirrors overpy's own status handling, which only runs inside its query().
+    if response.status_code == 200:
+        content_type = response.headers.get('Content-Type', '').split(';')[0]
+        if content_type == 'application/json':
+            return api.parse_json(response.content)
+        if content_type == 'application/osm3s+xml':
+            return api.parse_xml(response.content)
+        raise overpy.exception.OverpassUnknownContentType(content_type)
+    if response.status_code == 400:
+        raise overpy.exception.OverpassBadRequest(query, msgs=[response.text[:200]])
+    if response.status_code == 429:
+        raise overpy.exception.OverpassTooManyRequests()
+    if response.status_code == 504:
+        raise overpy.exception.OverpassGatewayTimeout()
+    raise overpy.exception.OverpassUnknownHTTPStatusCode(response.status_code)
+
+
+def _query_overpass(query):
+    api = overpy.Overpass(url=OVERPASS_URL)
+    # overpy's query() reads through urlopen without a timeout, so a hung
+    # server would hold the worker indefinitely; fetch here and let it parse.
+    response = requests.post(OVERPASS_URL, data=query.encode('utf-8'), timeout=OVERPASS_TIMEOUT)
+    result = _parse_overpass(api, query, response)
+    return [
+        {
+            'id': str(node.id),
+            'name': node.tags.get('name', 'Unknown'),
+            'latitude': float(node.lat),
+            'longitude': float(node.lon),
+            'tags': node.tags
+        }
+        for node in result.nodes
+    ]
+
+
+def fetch_places(query):
+    """
+    Run an Overpass query, sharing the call with identical in-flight queries.
+
+    The returned list is shared between every caller that was collapsed onto
+    the same upstream call and with the result cache, so it must be treated
+    as read-only.
+
+    Args:
+        query (str): Overpass QL query
+
+    Returns:
+        list: Place dictionaries (id, name, latitude, longitude, tags)
+    """
+    query = normalize_query(query)
+    return overpass.get(query, _query_overpass, query)
+
+
+def _query_osrm(coordinates, params):
+    response = requests.get(f'{OSRM_URL}/{coordinates}', params=params, timeout=OSRM_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_route(start_lat, start_lon, end_lat, end_lon, params):
+    """
+    Request a route from OSRM, sharing the call with identical in-flight requests.
+
+    Args:
+        start_lat (float): Start latitude
+        start_lon (float): Start longitude
+        end_lat (float): End latitude
+        end_lon (float): End longitude
+        params (dict): OSRM query parameters
+
+    Returns:
+        dict: Decoded OSRM response (shared, treat as read-only)
+    """
+    coordinates = '{},{};{},{}'.format(
+        normalize_coordinate(start_lon), normalize_coordinate(start_lat),
+        normalize_coordinate(end_lon), normalize_coordinate(end_lat)
+    )
+    key = (coordinates, tuple(sorted(params.items())))
+    return osrm.get(key, _query_osrm, coordinates, params)
+
+
+def upstream_stats():
+    return {
+        'overpass': overpass.stats(),
+        'osrm': osrm.stats(),
+    }
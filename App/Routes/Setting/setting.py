@@ -1,13 +1,22 @@
 from flask import Blueprint, request, session
-from flask_sqlalchemy import SQLAlchemy
 from marshmallow import ValidationError
 from ..Models.Setting import Settings
 from .settingSchema import SettingsSchema, SettingsUpdateSchema
-from ...Utils.Response import base_response
+from ..Models.Database import db
+from ..Models.User import User, get_version, bump_version
+from ...Utils.Response import json_response
+from ...Utils.Cache import app_cache
+from ...Utils.ETag import make_etag, etag_header, not_modified
 from werkzeug.exceptions import NotFound, Unauthorized
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/settings')
-db = SQLAlchemy()
+
+def settings_cache():
+    return app_cache('settings', 'SETTINGS_CACHE')
+
+def load_settings(user_id):
+    settings = Settings.query.filter_by(user_id=user_id).first()
+    return SettingsSchema().dump(settings) if settings else None
 
 # Middleware to check if user is authenticated
 def require_auth():
@@ -20,25 +29,33 @@ def get_settings():
     try:
         require_auth()
         user_id = session['user_id']
-        settings = Settings.query.filter_by(user_id=user_id).first()
+        version = get_version(user_id, User.settings_version)
+        etag = make_etag('settings', user_id, version)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        # Keyed by version so a body is only ever served with its own ETag,
+        # whatever another worker or a racing reader left in the cache.
+        settings = settings_cache().get(f'{user_id}:{version}', lambda: load_settings(user_id))
         if not settings:
             raise NotFound(description='Settings not found')
-        schema = SettingsSchema()
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Settings retrieved successfully',
-            data=schema.dump(settings)
+            data=settings,
+            headers=etag_header(etag)
         )
     except NotFound as e:
-        return base_response(
+        return json_response(
             code=404,
             status='error',
             message=str(e),
             error={'settings': 'Not found'}
         )
     except Exception as e:
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
@@ -59,22 +76,23 @@ def update_settings():
         settings_data = schema.load(data, partial=True)
         for key, value in settings_data.items():
             setattr(settings, key, value)
+        bump_version(user_id, User.settings_version)
         db.session.commit()
-        return base_response(
+        return json_response(
             code=200,
             status='success',
             message='Settings updated successfully',
             data=schema.dump(settings)
         )
     except ValidationError as e:
-        return base_response(
+        return json_response(
             code=400,
             status='error',
             message='Validation error',
             error=e.messages
         )
     except NotFound as e:
-        return base_response(
+        return json_response(
             code=404,
             status='error',
             message=str(e),
@@ -82,9 +100,9 @@ def update_settings():
         )
     except Exception as e:
         db.session.rollback()
-        return base_response(
+        return json_response(
             code=500,
             status='error',
             message='Internal server error',
             error=str(e)
-        )
\ No newline at end of file
+        )
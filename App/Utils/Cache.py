@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import current_app
+from .Metrics import CACHE_REQUESTS
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by ReadThroughCache.
+
+    Values must be JSON-serializable so that every backend can hold them.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Bounded in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache shared by every worker process on the host through a SQLite file.
+
+    A local stand-in for a networked store such as Redis: writes from one
+    worker, including invalidations, are seen by all the others.
+    """
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires_at >= ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl)
+        )
+        # Cheap bound: drop expired rows, then the soonest-expiring overflow
+        conn.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+
+def make_backend(kind, max_entries=10000, path=None):
+    """
+    Args:
+        kind (str): 'memory' or 'sqlite'
+        max_entries (int): Bound on the number of cached entries
+        path (str, optional): Database file for the 'sqlite' backend
+
+    Returns:
+        CacheBackend: Configured backend
+    """
+    if kind == 'memory':
+        return MemoryBackend(max_entries)
+    if kind == 'sqlite':
+        return SQLiteBackend(path, max_entries)
+    raise ValueError(f'Unknown cache backend: {kind}')
+
+
+class ReadThroughCache:
+    """
+    Read-through cache: misses are loaded from the source and stored.
+
+    Loaders returning None are not cached, so missing rows are looked up
+    again on the next request. Hits and misses are counted in
+    cache_requests_total on /metrics.
+    """
+
+    def __init__(self, name, backend, ttl=300):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key, loader):
+        """
+        Args:
+            key: Cache key (converted to str)
+            loader (callable): Returns the value on a miss
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self.backend.get(self._key(key))
+        if value is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result='hit')
+            return value
+        CACHE_REQUESTS.inc(cache=self.name, result='miss')
+        value = loader()
+        if value is not None:
+            self.backend.set(self._key(key), value, self.ttl)
+        return value
+
+    def set(self, key, value):
+        self.backend.set(self._key(key), value, self.ttl)
+
+    def invalidate(self, key):
+        self.backend.delete(self._key(key))
+
+
+def app_cache(name, prefix):
+    """
+    ReadThroughCache for the current app, built once from its config.
+
+    Reads {prefix}_BACKEND ('memory' or 'sqlite'), {prefix}_TTL,
+    {prefix}_SIZE and {prefix}_PATH (defaults to instance/cache.db).
+    """
+    caches = current_app.extensions.setdefault('read_through_caches', {})
+    if name not in caches:
+        config = current_app.config
+        backend = make_backend(
+            config.get(f'{prefix}_BACKEND', 'memory'),
+            max_entries=int(config.get(f'{prefix}_SIZE', 10000)),
+            path=config.get(f'{prefix}_PATH', os.path.join(current_app.instance_path, 'cache.db'))
+        )
+        caches[name] = ReadThroughCache(name, backend, ttl=int(config.get(f'{prefix}_TTL', 300)))
+    return caches[name]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream dependency is unhealthy.
+
+    The circuit opens after failure_threshold consecutive failures, where a
+    call slower than slow_call_threshold seconds counts as a failure even if
+    it succeeded. After recovery_timeout seconds a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+
+    is_failure decides whether an exception raised by the call counts
+    against the upstream (e.g. a 4xx response is the caller's fault).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0, slow_call_threshold=10.0,
+                 is_failure=None):
+        self.name = name
+        self.is_failure = is_failure or (lambda error: True)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        """
+        Returns:
+            bool: True if a call may go upstream now
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, duration):
+        if duration > self.slow_call_threshold:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(f'{self.name} circuit is open')
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'rejected': self._rejected,
+            }
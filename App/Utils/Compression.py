@@ -0,0 +1,100 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+DEFAULT_COMPRESSION_CONFIG = {
+    'COMPRESS_MIN_SIZE': 1024,  # bytes; smaller bodies are not worth the CPU
+    'COMPRESS_GZIP_LEVEL': 6,
+    'COMPRESS_BR_LEVEL': 5,
+    'COMPRESS_ZSTD_LEVEL': 3,
+    'COMPRESS_ALGORITHMS': ('zstd', 'br', 'gzip'),  # server preference order
+    'COMPRESS_MIMETYPES': ('application/json',),
+    'COMPRESS_EXEMPT_ENDPOINTS': ('inference.video_feed', 'inference.video_feed_source'),
+}
+
+
+def _compressors(config):
+    compressors = {
+        'gzip': lambda data: gzip.compress(data, compresslevel=int(config['COMPRESS_GZIP_LEVEL']), mtime=0),
+    }
+    if brotli is not None:
+        compressors['br'] = lambda data: brotli.compress(data, quality=int(config['COMPRESS_BR_LEVEL']))
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=int(config['COMPRESS_ZSTD_LEVEL']))
+        compressors['zstd'] = compressor.compress
+    return compressors
+
+
+def choose_encoding(accept_encodings, algorithms):
+    """
+    Pick the content coding for a request.
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header
+        algorithms (iterable): Available codings in server preference order
+
+    Returns:
+        str or None: Chosen coding, None to send the body uncompressed
+    """
+    best, best_quality = None, 0
+    for algorithm in algorithms:
+        quality = accept_encodings[algorithm]
+        if quality > best_quality:
+            best, best_quality = algorithm, quality
+    return best
+
+
+def _as_list(value):
+    # Lists may come from the environment as comma-separated strings.
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return list(value)
+
+
+def init_compression(app):
+    """
+    Compress JSON responses according to the client's Accept-Encoding.
+
+    gzip is always available; brotli and zstd are used when their packages
+    are installed. Streamed responses (the MJPEG /video_feed, NDJSON export)
+    and bodies under COMPRESS_MIN_SIZE are sent as is.
+    """
+    for key, value in DEFAULT_COMPRESSION_CONFIG.items():
+        app.config.setdefault(key, value)
+    config = app.config
+    compressors = _compressors(config)
+    algorithms = [name for name in _as_list(config['COMPRESS_ALGORITHMS']) if name in compressors]
+    mimetypes = set(_as_list(config['COMPRESS_MIMETYPES']))
+    exempt = set(_as_list(config['COMPRESS_EXEMPT_ENDPOINTS']))
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.mimetype not in mimetypes
+                or request.endpoint in exempt
+                or 'Content-Encoding' in response.headers
+                or not 200 <= response.status_code < 300):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < int(config['COMPRESS_MIN_SIZE']):
+            return response
+        encoding = choose_encoding(request.accept_encodings, algorithms)
+        if encoding is None:
+            return response
+
+        response.set_data(compressors[encoding](data))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return app
@@ -0,0 +1,31 @@
+from flask import request, Response
+from werkzeug.http import quote_etag
+
+
+def make_etag(kind, user_id, version):
+    """
+    Build the opaque ETag value for a per-user resource version.
+
+    Args:
+        kind (str): Resource name (e.g. 'favorites')
+        user_id: Owner of the resource
+        version (int): Current version counter
+
+    Returns:
+        str: Unquoted ETag value
+    """
+    return f'{kind}-{user_id}-{version or 0}'
+
+
+def etag_header(etag):
+    return {'ETag': quote_etag(etag, weak=True)}
+
+
+def not_modified(etag):
+    """
+    Returns:
+        Response or None: A 304 response if the client already has etag
+    """
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=etag_header(etag))
+    return None
@@ -0,0 +1,201 @@
+import numpy as np
+
+EARTH_RADIUS = 6371000  # Earth radius in meters
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in meters.
+
+    Accepts scalars or NumPy arrays and broadcasts like any NumPy ufunc, so a
+    single call can measure one point against many or many pairs at once.
+    """
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def project(lats, lons, origin_lat, origin_lon):
+    """
+    Project coordinates to a local equirectangular plane in meters.
+
+    Accurate to well under a meter over the few kilometres of a walking route.
+    """
+    cos_lat = np.cos(np.radians(origin_lat))
+    x = np.radians(np.subtract(lons, origin_lon)) * cos_lat * EARTH_RADIUS
+    y = np.radians(np.subtract(lats, origin_lat)) * EARTH_RADIUS
+    return x, y
+
+
+def point_to_segments(lat, lon, lats, lons):
+    """
+    Distance from a point to every segment of a polyline.
+
+    Args:
+        lat (float): Point latitude
+        lon (float): Point longitude
+        lats (np.ndarray): Polyline vertex latitudes
+        lons (np.ndarray): Polyline vertex longitudes
+
+    Returns:
+        tuple: (distances, t) where distances[i] is the distance in meters to
+        segment i and t[i] in [0, 1] is the position of the closest point on it
+    """
+    x, y = project(lats, lons, lat, lon)
+    ax, ay = x[:-1], y[:-1]
+    dx, dy = x[1:] - ax, y[1:] - ay
+    length_sq = dx * dx + dy * dy
+    t = np.divide(-(ax * dx + ay * dy), length_sq, out=np.zeros_like(length_sq), where=length_sq > 0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(ax + t * dx, ay + t * dy), t
+
+
+def simplify(lats, lons, tolerance):
+    """
+    Douglas-Peucker line simplification.
+
+    Args:
+        lats (np.ndarray): Vertex latitudes
+        lons (np.ndarray): Vertex longitudes
+        tolerance (float): Maximum allowed deviation in meters
+
+    Returns:
+        np.ndarray: Indices of the vertices to keep, endpoints included
+    """
+    n = len(lats)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+
+    x, y = project(lats, lons, lats[0], lons[0])
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        ax, ay = x[start], y[start]
+        dx, dy = x[end] - ax, y[end] - ay
+        px, py = x[start + 1:end] - ax, y[start + 1:end] - ay
+        length_sq = dx * dx + dy * dy
+        t = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0) if length_sq > 0 else 0.0
+        distances = np.hypot(px - t * dx, py - t * dy)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return np.flatnonzero(keep)
+
+
+def encode_polyline(lats, lons, precision=5):
+    """
+    Encode coordinates with the Google encoded polyline algorithm.
+
+    Args:
+        lats (array-like): Latitudes
+        lons (array-like): Longitudes
+        precision (int): Decimal places kept (5 for Google, 6 for OSRM polyline6)
+
+    Returns:
+        str: Encoded polyline
+    """
+    factor = 10 ** precision
+    values = np.round(np.column_stack((lats, lons)) * factor).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    deltas = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chunks = []
+    for value in deltas.tolist():
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lon, precision=9):
+    """
+    Encode a coordinate as a geohash string.
+
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
+        precision (int): Number of characters (9 is about 5 m)
+
+    Returns:
+        str: Geohash
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """
+    Returns:
+        tuple: (height, width) of a geohash cell in degrees
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def geohash_cover(lat, lon, radius, max_precision=9):
+    """
+    Geohash prefixes whose cells together cover a circle.
+
+    Picks the finest precision whose cells are at least radius tall and wide,
+    then returns the cell containing the center and its eight neighbours.
+
+    Args:
+        lat (float): Center latitude
+        lon (float): Center longitude
+        radius (float): Radius in meters
+        max_precision (int): Finest precision to consider
+
+    Returns:
+        list: Distinct geohash prefixes
+    """
+    meters_per_degree = np.pi * EARTH_RADIUS / 180
+    precision = 1
+    for candidate in range(max_precision, 0, -1):
+        height, width = geohash_cell_size(candidate)
+        if (height * meters_per_degree >= radius and
+                width * meters_per_degree * np.cos(np.radians(lat)) >= radius):
+            precision = candidate
+            break
+
+    height, width = geohash_cell_size(precision)
+    prefixes = set()
+    for dlat in (-height, 0.0, height):
+        for dlon in (-width, 0.0, width):
+            cell_lat = min(max(lat + dlat, -90.0), 90.0 - 1e-9)
+            cell_lon = (lon + dlon + 180.0) % 360.0 - 180.0
+            prefixes.add(geohash_encode(cell_lat, cell_lon, precision))
+    return sorted(prefixes)
@@ -0,0 +1,279 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_METRICS_CONFIG = {
+    'SLOW_REQUEST_THRESHOLD': 1.0,  # seconds; requests slower than this are logged with their stages
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for name, key, extra, value in self._samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+                samples.append((f'{self.name}_sum', key, (), total))
+                samples.append((f'{self.name}_count', key, (), count))
+        return samples
+
+
+class Registry:
+    """
+    Process-wide set of metrics rendered in the Prometheus text format.
+
+    Each worker process keeps its own values; scrape every worker (or run a
+    single process per pod) to see the whole picture.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} already registered with a different type or labels')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ('blueprint', 'endpoint', 'method', 'status')
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled.', ('blueprint',)
+)
+STAGE_DURATION = REGISTRY.histogram(
+    'stage_duration_seconds', 'Time spent in named processing stages (inference, upstream calls, ...).',
+    ('stage',)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', 'Read-through cache lookups, by cache and hit or miss.', ('cache', 'result')
+)
+DB_QUERIES = REGISTRY.counter('db_queries_total', 'Database statements executed.')
+DB_QUERY_DURATION = REGISTRY.histogram(
+    'db_query_duration_seconds', 'Time spent executing database statements.',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+
+def record_stage(name, seconds):
+    """
+    Record time spent in a stage, both globally and for the current request.
+
+    Args:
+        name (str): Stage name, e.g. 'inference.detect'
+        seconds (float): Duration
+    """
+    STAGE_DURATION.observe(seconds, stage=name)
+    _add_to_request(name, seconds)
+
+
+def _add_to_request(name, seconds):
+    if has_request_context() and 'metrics_stages' in g:
+        entry = g.metrics_stages.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage name (see record_stage)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Count and time every statement executed through a SQLAlchemy engine."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        DB_QUERIES.inc()
+        DB_QUERY_DURATION.observe(seconds)
+        _add_to_request('db', seconds)
+
+
+def _format_stages(stages, total):
+    parts = [f'{name}={count}x{seconds * 1000:.1f}ms' for name, (count, seconds) in
+             sorted(stages.items(), key=lambda item: -item[1][1])]
+    # Stages may overlap (a db query inside an upstream call), so this is only approximate.
+    other = total - sum(seconds for _, seconds in stages.values())
+    parts.append(f'other={max(other, 0.0) * 1000:.1f}ms')
+    return ' '.join(parts)
+
+
+def metrics_view():
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """
+    Time every request and serve all metrics at /metrics.
+
+    Requests slower than SLOW_REQUEST_THRESHOLD seconds are logged with a
+    breakdown of the stages recorded while handling them.
+    """
+    for key, value in DEFAULT_METRICS_CONFIG.items():
+        app.config.setdefault(key, value)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_stages = {}
+        g.metrics_blueprint = request.blueprint or ''
+        REQUESTS_IN_FLIGHT.inc(blueprint=g.metrics_blueprint)
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def observe_request(error=None):
+        if 'metrics_start' not in g:
+            return
+        duration = time.perf_counter() - g.metrics_start
+        status = g.get('metrics_status', 500)
+        endpoint = request.endpoint or 'unmatched'
+        REQUESTS_IN_FLIGHT.dec(blueprint=g.metrics_blueprint)
+        REQUEST_DURATION.observe(
+            duration, blueprint=g.metrics_blueprint, endpoint=endpoint, method=request.method, status=status
+        )
+
+        threshold = app.config.get('SLOW_REQUEST_THRESHOLD')
+        if threshold is not None and float(threshold) > 0 and duration > float(threshold):
+            logger.warning(
+                f"Slow request {request.method} {request.path} {status} in {duration * 1000:.1f}ms: "
+                f"{_format_stages(g.metrics_stages, duration)}"
+            )
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    return app
@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from .Metrics import stage
+
+DEFAULT_HASH_METHOD = 'scrypt'
+# The pool is started inside a threaded server; forking that can deadlock
+# the children on inherited locks, so they start from a clean process.
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class PasswordHasher:
+    """
+    Password hashing off the request threads.
+
+    Hashes are computed in a process pool so that CPU-bound scrypt/PBKDF2
+    work neither holds the GIL nor blocks a request worker. With workers=0
+    hashing runs inline.
+
+    Args:
+        method (str): Werkzeug hash method, e.g. 'scrypt' or 'pbkdf2:sha256:600000'
+        workers (int): Process pool size
+        timeout (float): Seconds to wait for a hash before giving up
+    """
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, workers=2, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._prefix = None
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._executor is None:
+                # Created on first use so each pre-forked server worker gets its own pool
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(POOL_START_METHOD)
+                )
+        return self._executor.submit(fn, *args).result(timeout=self.timeout)
+
+    def hash(self, password):
+        with stage('password.hash'):
+            return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        with stage('password.verify'):
+            return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Returns:
+            bool: True if password_hash was made with other parameters than the configured method
+        """
+        if self._prefix is None:
+            # Werkzeug expands defaults (e.g. 'scrypt' -> 'scrypt:32768:8:1'), so compare expanded forms
+            self._prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+def password_hasher():
+    """
+    PasswordHasher for the current app, configured from PASSWORD_HASH_METHOD,
+    PASSWORD_HASH_WORKERS and PASSWORD_HASH_TIMEOUT.
+    """
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        config = current_app.config
+        hasher = PasswordHasher(
+            method=config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+            workers=int(config.get('PASSWORD_HASH_WORKERS', 2)),
+            timeout=float(config.get('PASSWORD_HASH_TIMEOUT', 10))
+        )
+        current_app.extensions['password_hasher'] = hasher
+    return hasher
@@ -0,0 +1,119 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Modes accepted by the detectors. f32/bf16/f16 set OpenVINO's
+# INFERENCE_PRECISION_HINT on the FP32 IR; int8 loads a quantized IR instead.
+# None leaves the plugin default (bf16 on AMX Xeons, f32 elsewhere).
+PRECISION_MODES = ('f32', 'bf16', 'f16', 'int8')
+BASELINE_PRECISION = 'f32'
+
+# OPTIMIZATION_CAPABILITIES entry a device must report to run a hint natively
+_CAPABILITIES = {'bf16': 'BF16', 'f16': 'FP16', 'int8': 'INT8'}
+
+
+def check_precision(precision):
+    if not precision:
+        return None
+    precision = str(precision).lower()
+    if precision not in PRECISION_MODES:
+        raise ValueError(f'Unknown precision {precision!r}, expected one of {", ".join(PRECISION_MODES)}')
+    return precision
+
+
+def int8_candidates(path):
+    """
+    Where a quantized variant of an FP32 IR is looked for.
+
+    Covers ultralytics exports (yolo11n_openvino_model ->
+    yolo11n_int8_openvino_model), Open Model Zoo layouts (FP16-INT8/ or
+    INT8/ beside the model) and a plain name_int8.xml suffix.
+
+    Args:
+        path (str): FP32 model directory or .xml file
+
+    Returns:
+        list: Candidate paths, most specific first
+    """
+    path = os.path.normpath(path)
+    directory, name = os.path.split(path)
+    if name.endswith('_openvino_model'):
+        return [os.path.join(directory, name[:-len('_openvino_model')] + '_int8_openvino_model')]
+
+    stem, extension = os.path.splitext(name)
+    candidates = [
+        os.path.join(directory, f'{stem}_int8{extension}'),
+        os.path.join(directory, 'FP16-INT8', name),
+        os.path.join(directory, 'INT8', name),
+    ]
+    parent, folder = os.path.split(directory)
+    if folder.endswith('_openvino_model'):
+        candidates.insert(0, os.path.join(parent, folder[:-len('_openvino_model')] + '_int8_openvino_model', name))
+    elif folder.upper() in ('FP32', 'FP16'):
+        candidates.insert(0, os.path.join(parent, 'FP16-INT8', name))
+    return candidates
+
+
+def find_int8_model(path):
+    """
+    Returns:
+        str or None: Path of the INT8 variant of path, None if there is none on disk
+    """
+    for candidate in int8_candidates(path):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def resolve_model(path, precision):
+    """
+    Pick the IR to load for a precision mode.
+
+    Args:
+        path (str): FP32 model directory or .xml file
+        precision (str or None): One of PRECISION_MODES
+
+    Returns:
+        tuple: (path to load, precision actually used); int8 falls back to
+        (path, None) when no quantized variant exists
+    """
+    precision = check_precision(precision)
+    if precision != 'int8':
+        return path, precision
+    int8_path = find_int8_model(path)
+    if int8_path is None:
+        logger.warning(f"No INT8 variant of {path} found, using the FP32 model")
+        return path, None
+    return int8_path, precision
+
+
+def compile_properties(core, device, precision):
+    """
+    OpenVINO compile_model properties for a precision mode.
+
+    The CPU plugin defaults to bf16 on hosts with AMX/AVX512-BF16, so f32 is
+    set explicitly to get a true f32 baseline. Hints the device cannot run
+    natively fall back to f32 instead of being emulated.
+
+    Args:
+        core (openvino.Core): Core the model is compiled on
+        device (str): e.g. 'CPU'
+        precision (str or None): One of PRECISION_MODES, as returned by resolve_model
+
+    Returns:
+        tuple: (properties dict, precision actually used)
+    """
+    precision = check_precision(precision)
+    if precision is None or precision == 'int8':
+        # An INT8 IR runs its quantized layers in int8 whatever the hint; the plugin picks the rest.
+        return {}, precision
+    if precision != BASELINE_PRECISION:
+        try:
+            capabilities = core.get_property(device, 'OPTIMIZATION_CAPABILITIES')
+        except Exception:
+            capabilities = ()
+        if _CAPABILITIES[precision] not in capabilities:
+            logger.warning(f"{device} does not support {precision} natively, using f32")
+            precision = BASELINE_PRECISION
+    return {'INFERENCE_PRECISION_HINT': precision}, precision
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import deque
+from flask import current_app
+
+
+class FailureRateLimiter:
+    """
+    Sliding-window count of failures per key.
+
+    A key is blocked once it has max_failures failures within window seconds;
+    it unblocks as the oldest failures age out of the window.
+    """
+
+    def __init__(self, max_failures, window, max_keys=100000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._failures = {}
+
+    def _prune(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and now - failures[0] > self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key):
+        """
+        Returns:
+            int: Seconds until key may try again, 0 if it is not blocked
+        """
+        now = time.monotonic()
+        with self._lock:
+            failures = self._prune(key, now)
+            if failures is None or len(failures) < self.max_failures:
+                return 0
+            return int(self.window - (now - failures[-self.max_failures])) + 1
+
+    def record_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._failures and len(self._failures) >= self.max_keys:
+                for stale in [k for k in self._failures if now - self._failures[k][-1] > self.window]:
+                    del self._failures[stale]
+                if len(self._failures) >= self.max_keys:
+                    self._failures.pop(next(iter(self._failures)))
+            self._failures.setdefault(key, deque()).append(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+def login_rate_limiters():
+    """
+    Per-email and per-IP login failure limiters for the current app, configured
+    from LOGIN_MAX_FAILURES_PER_EMAIL, LOGIN_MAX_FAILURES_PER_IP and
+    LOGIN_FAILURE_WINDOW (seconds).
+    """
+    limiters = current_app.extensions.get('login_rate_limiters')
+    if limiters is None:
+        config = current_app.config
+        window = float(config.get('LOGIN_FAILURE_WINDOW', 300))
+        limiters = (
+            FailureRateLimiter(int(config.get('LOGIN_MAX_FAILURES_PER_EMAIL', 5)), window),
+            FailureRateLimiter(int(config.get('LOGIN_MAX_FAILURES_PER_IP', 20)), window),
+        )
+        current_app.extensions['login_rate_limiters'] = limiters
+    return limiters
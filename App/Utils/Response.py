@@ -1,14 +1,26 @@
+import dataclasses
+import datetime
+import json
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
 def base_response(code, status, message, data=None, error=None):
     """
     Create a standardized API response.
-    
+
     Args:
         code (int): HTTP status code
         status (str): Status of the response (e.g., 'success', 'error')
         message (str): Descriptive message about the response
         data (dict, optional): Response data payload
         error (dict, optional): Error details if any
-        
+
     Returns:
         dict: Standardized response dictionary
     """
@@ -19,4 +31,79 @@ def base_response(code, status, message, data=None, error=None):
         'data': data if data is not None else {},
         'error': error if error is not None else {}
     }
-    return response
\ No newline at end of file
+    return response
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, 'tolist'):  # NumPy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def dumps(obj):
+    """
+    Serialize obj to JSON bytes with the fastest available encoder.
+
+    Uses orjson when installed (with NumPy and dataclass support), otherwise
+    the stdlib json module with compact separators.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def json_response(code, status, message, data=None, error=None, headers=None):
+    """
+    Create a standardized API response as a Flask Response.
+
+    Same envelope as base_response, but the HTTP status matches code and the
+    body is encoded once with dumps().
+
+    Args:
+        code (int): HTTP status code
+        status (str): Status of the response (e.g., 'success', 'error')
+        message (str): Descriptive message about the response
+        data (dict, optional): Response data payload
+        error (dict, optional): Error details if any
+        headers (dict, optional): Extra response headers
+
+    Returns:
+        Response: JSON response
+    """
+    body = dumps(base_response(code, status, message, data, error))
+    return Response(body, status=code, headers=headers, mimetype='application/json')
+
+@lru_cache(maxsize=None)
+def compile_serializer(record_type, fields=None):
+    """
+    Build a serializer for trusted records of a TypedDict or dataclass type.
+
+    For data the server built itself, validating it again through
+    marshmallow on the way out is wasted work; the returned function only
+    picks the declared (or requested) fields in one C-level getter call per
+    record.
+
+    Args:
+        record_type (type): TypedDict or dataclass describing the records
+        fields (tuple, optional): Subset of field names to keep
+
+    Returns:
+        callable: Takes a list of records and returns a list of dicts
+    """
+    if dataclasses.is_dataclass(record_type):
+        names = tuple(f.name for f in dataclasses.fields(record_type))
+        getter_factory = attrgetter
+    else:
+        names = tuple(record_type.__annotations__)
+        getter_factory = itemgetter
+    if fields is not None:
+        names = tuple(name for name in names if name in fields)
+
+    if len(names) == 1:
+        name = names[0]
+        getter = getter_factory(name)
+        return lambda records: [{name: getter(record)} for record in records]
+
+    getter = getter_factory(*names)
+    return lambda records: [dict(zip(names, getter(record))) for record in records]
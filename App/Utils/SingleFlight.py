@@ -0,0 +1,79 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share the same key into one execution.
+
+    The first caller for a key runs the function; every caller that arrives
+    while it is still in flight waits for it and receives the same result
+    (or the same exception).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._collapsed = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once for all concurrent callers of key.
+
+        Args:
+            key (hashable): Normalized identity of the call
+            fn (callable): Function performing the actual work
+
+        Returns:
+            The value returned by fn for the leading caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'executed': self._executed,
+                'collapsed': self._collapsed,
+                'in_flight': len(self._calls),
+            }
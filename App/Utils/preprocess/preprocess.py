@@ -1,6 +1,8 @@
 from PIL import Image
+import cv2
 import numpy as np
 
+
 def preprocess_image(image, target_shape):
     if image.mode != "RGB":
         image = image.convert("RGB")
@@ -9,4 +11,88 @@ def preprocess_image(image, target_shape):
     image_np = image_np / 255.0
     image_np = image_np.transpose((2, 0, 1))
     image_np = np.expand_dims(image_np, axis=0)
-    return image_np
\ No newline at end of file
+    return image_np
+
+
+# Start-of-frame markers carry the image size; C4 (DHT), C8 (JPG) and CC (DAC) are not SOFs.
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_REDUCED_DECODE_FLAGS = {8: 'IMREAD_REDUCED_COLOR_8', 4: 'IMREAD_REDUCED_COLOR_4', 2: 'IMREAD_REDUCED_COLOR_2'}
+
+
+def jpeg_size(data):
+    """
+    Read the dimensions from a JPEG header without decoding it.
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        tuple or None: (width, height), None if data is not a JPEG
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # markers without a length
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+
+def reduced_decode_factor(width, height, min_long_side, min_short_side=0):
+    """
+    Largest JPEG DCT downscale (8, 4, 2 or 1) that keeps the image at least
+    as large as the model inputs it will be resized to.
+    """
+    long_side, short_side = max(width, height), min(width, height)
+    for factor in _REDUCED_DECODE_FLAGS:
+        if long_side // factor >= min_long_side and short_side // factor >= min_short_side:
+            return factor
+    return 1
+
+
+def decode_image(data, min_long_side, min_short_side=0):
+    """
+    Decode an uploaded image, downscaling JPEGs during decoding.
+
+    JPEGs are decoded at 1/2, 1/4 or 1/8 resolution when that still covers
+    the model input size, which skips most of the IDCT work and never
+    materializes the full-resolution frame.
+
+    Args:
+        data (bytes): Encoded image
+        min_long_side (int): Smallest acceptable long side after decoding
+        min_short_side (int): Smallest acceptable short side after decoding
+
+    Returns:
+        tuple: (BGR image or None, (scale_x, scale_y)) where scale maps
+            coordinates in the decoded image back to the original
+    """
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(data)
+    if size is not None:
+        factor = reduced_decode_factor(size[0], size[1], min_long_side, min_short_side)
+        if factor > 1:
+            flag = getattr(cv2, _REDUCED_DECODE_FLAGS[factor])
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image is None or size is None:
+        return image, (1.0, 1.0)
+
+    width, height = size
+    decoded_height, decoded_width = image.shape[:2]
+    if (decoded_width > decoded_height) != (width > height):
+        # EXIF orientation was applied while decoding; the header size is pre-rotation.
+        width, height = height, width
+    return image, (width / decoded_width, height / decoded_height)
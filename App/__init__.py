@@ -1,7 +1,125 @@
-
+import gc
+import os
 from flask import Flask
+from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import import_string
+from .Routes.Models.Database import db, init_db, DEFAULT_DB_CONFIG
+from .Routes.Models.Favorite import backfill_geohashes
+from .Routes.Models.User import add_version_columns
+from .Utils.Compression import init_compression, DEFAULT_COMPRESSION_CONFIG
+from .Utils.Metrics import init_metrics, instrument_engine, DEFAULT_METRICS_CONFIG
+
+# Import strings of the blueprints registered by default. Workers that only
+# serve part of the API can set BLUEPRINTS to a subset so that, for example,
+# the inference stack is never imported.
+DEFAULT_BLUEPRINTS = (
+    'App.Routes.Health.health:health_bp',
+    'App.Routes.Setting.setting:settings_bp',
+    'App.Routes.Places.place:places_bp',
+    'App.Routes.Favorite.favorite:favorites_bp',
+    'App.Routes.Auth.auth:auth_bp',
+    'App.Routes.CV.cv:inference_bp',
+)
+
+
+def _env_config():
+    config = {
+        'SECRET_KEY': os.getenv('SECRET_KEY'),
+        'SQLALCHEMY_DATABASE_URI': os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///users.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Request bodies above this are rejected before they are read (/predict has its own, lower limit)
+        'MAX_CONTENT_LENGTH': int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)),
+        'GOOGLE_OAUTH_CLIENT_ID': os.getenv('GOOGLE_OAUTH_CLIENT_ID'),
+        'GOOGLE_OAUTH_CLIENT_SECRET': os.getenv('GOOGLE_OAUTH_CLIENT_SECRET'),
+    }
+    for key in ('BLUEPRINTS', 'PROXY_FIX_HOPS', 'PRELOAD_MODELS', 'WARMUP_ON_START', 'DETECTION_LOG_SAMPLE_RATE',
+                'PREDICT_MAX_UPLOAD_BYTES', 'VIDEO_JOBS_DIR', 'VIDEO_JOB_WORKERS', 'VIDEO_JOB_BATCH_SIZE',
+                'VIDEO_JOB_MAX_UPLOAD_BYTES',
+                *DEFAULT_DB_CONFIG, *DEFAULT_COMPRESSION_CONFIG, *DEFAULT_METRICS_CONFIG):
+        if os.getenv(key) is not None:
+            config[key] = os.getenv(key)
+    return config
+
+
+def _is_enabled(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def register_blueprints(app):
+    """
+    Register the blueprints listed in BLUEPRINTS ('module:attribute' strings).
+
+    Blueprint modules are only imported here, so a disabled blueprint costs
+    nothing at startup.
+    """
+    names = app.config.get('BLUEPRINTS', DEFAULT_BLUEPRINTS)
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    for name in names:
+        app.register_blueprint(import_string(name))
+
+    if 'auth' in app.blueprints:
+        from flask_dance.contrib.google import make_google_blueprint
+        app.register_blueprint(make_google_blueprint(scope=["profile", "email"]), url_prefix="/login")
+
+
+def preload(app):
+    """
+    Load the inference models before the server forks its workers.
+
+    Meant for pre-fork servers (e.g. gunicorn --preload). Libraries and
+    model files are read once in the master and shared copy-on-write;
+    compilation still happens per worker on first use. gc.freeze() moves
+    everything loaded so far out of the collector's reach, so collections in
+    the workers do not touch (and copy) the shared pages.
+    """
+    if 'inference' in app.blueprints:
+        from .Routes.CV.cv import preload_models
+        preload_models()
+    gc.collect()
+    gc.freeze()
+
+
+def create_app(config=None):
+    """
+    Build the Flask application.
+
+    Args:
+        config (dict, optional): Settings applied over the environment
+
+    Returns:
+        Flask: Configured application
+    """
+    load_dotenv()
 
-def create_app():
     app = Flask(__name__)
-    
+    app.config.update(_env_config())
+    if config:
+        app.config.update(config)
+
+    hops = int(app.config.get('PROXY_FIX_HOPS', 0))
+    if hops:
+        # Behind that many trusted proxies, take the client address and scheme
+        # from X-Forwarded-* so per-IP limits see clients, not the balancer.
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    init_db(app)
+    init_metrics(app)
+    init_compression(app)
+    register_blueprints(app)
+
+    with app.app_context():
+        instrument_engine(db.engine)
+        db.create_all()
+        add_version_columns()
+        backfill_geohashes()
+
+    if _is_enabled(app.config.get('PRELOAD_MODELS', False)):
+        preload(app)
+    elif _is_enabled(app.config.get('WARMUP_ON_START', False)) and 'inference' in app.blueprints:
+        # Warm-up threads and compiled models must not cross a fork; with
+        # PRELOAD_MODELS the first /readyz poll in each worker starts it.
+        from .Routes.CV.cv import start_warm_up
+        start_warm_up()
     return app
@@ -0,0 +1,165 @@
+"""
+Latency and detection agreement of the inference precision modes.
+
+Runs the /predict detector (or, with --omz, the Open Model Zoo OpenVINOModel)
+in each precision mode over a directory of images and compares every mode's
+detections with the f32 baseline. A detection agrees when a baseline
+detection of the same label overlaps it with IoU >= --iou; precision and
+recall are taken over all images, IoU, confidence and depth deltas over the
+agreeing pairs.
+
+Usage:
+    python benchmarks/bench_precision.py IMAGE_DIR [--modes f32,bf16,f16,int8]
+                                         [--repeat 3] [--limit 200] [--omz]
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from App.Utils.Precision import BASELINE_PRECISION, PRECISION_MODES, check_precision
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def load_images(directory, limit=None):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    images = []
+    for name in names[:limit]:
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            images.append(image)
+    return images
+
+
+def make_detector(mode, omz=False):
+    """
+    Returns:
+        tuple: (detect function taking a BGR image, precision actually used)
+    """
+    if omz:
+        from App.Routes.CV.config import Config
+        from App.Routes.Models.inferences import OpenVINOModel
+        model = OpenVINOModel(Config.MODEL_XML, Config.MODEL_BIN, Config.DEVICE, precision=mode)
+        return model.infer, model.precision
+
+    from App.Routes.CV.cv import ObjectDetector, load_config
+    detector = ObjectDetector(dataclasses.replace(load_config(), precision=mode))
+    if not detector.initialize():
+        raise RuntimeError(f'Could not initialize the detector in {mode} mode')
+    precisions = {detector.yolo_precision, detector.midas_precision}
+    return detector.detect, '/'.join(sorted(str(p) for p in precisions))
+
+
+def run(detect, images, repeat):
+    """
+    Returns:
+        tuple: (per-call latencies in seconds, detections per image from the first pass)
+    """
+    for image in images[:2]:
+        detect(image)  # compile-time kernel selection is not part of the comparison
+    latencies, detections = [], []
+    for i in range(repeat):
+        for image in images:
+            started = time.perf_counter()
+            result = detect(image)
+            latencies.append(time.perf_counter() - started)
+            if i == 0:
+                detections.append(result)
+    return np.array(latencies), detections
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def match(baseline, detections, threshold):
+    """
+    Greedily pair detections with baseline detections of the same label, most confident first.
+
+    Returns:
+        list: (baseline detection, detection, IoU) tuples
+    """
+    pairs, used = [], set()
+    for detection in sorted(detections, key=lambda d: -d['confidence']):
+        best, best_iou = None, threshold
+        for i, reference in enumerate(baseline):
+            if i in used or reference['label'] != detection['label']:
+                continue
+            overlap = iou(reference['bbox'], detection['bbox'])
+            if overlap >= best_iou:
+                best, best_iou = i, overlap
+        if best is not None:
+            used.add(best)
+            pairs.append((baseline[best], detection, best_iou))
+    return pairs
+
+
+def agreement(baseline, detections, threshold):
+    pairs = [pair for reference, result in zip(baseline, detections) for pair in match(reference, result, threshold)]
+    baseline_count = sum(len(result) for result in baseline)
+    count = sum(len(result) for result in detections)
+    depth = [abs(b['depth'] - d['depth']) / max(abs(b['depth']), 1e-6) for b, d, _ in pairs if 'depth' in b]
+    return {
+        'precision': len(pairs) / count if count else 1.0,
+        'recall': len(pairs) / baseline_count if baseline_count else 1.0,
+        'iou': float(np.mean([overlap for _, _, overlap in pairs])) if pairs else float('nan'),
+        'confidence': float(np.mean([abs(b['confidence'] - d['confidence']) for b, d, _ in pairs])) if pairs else float('nan'),
+        'depth': float(np.mean(depth)) if depth else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('images', help='directory of images to run')
+    parser.add_argument('--modes', default=','.join(PRECISION_MODES), help='comma-separated precision modes')
+    parser.add_argument('--repeat', type=int, default=3, help='timed passes over the image set')
+    parser.add_argument('--limit', type=int, help='use at most this many images')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU at which two detections agree')
+    parser.add_argument('--omz', action='store_true', help='evaluate the Open Model Zoo detector instead')
+    args = parser.parse_args()
+
+    modes = [check_precision(mode) for mode in args.modes.split(',') if mode.strip()]
+    if BASELINE_PRECISION in modes:
+        modes.remove(BASELINE_PRECISION)
+    modes.insert(0, BASELINE_PRECISION)
+    images = load_images(args.images, args.limit)
+    if not images:
+        raise SystemExit(f'No images in {args.images}')
+    print(f'{len(images)} images x {args.repeat} passes, {"OMZ" if args.omz else "YOLO + MiDaS"} detector')
+
+    header = (f'{"mode":<6} {"actual":<10} {"p50 ms":>8} {"p95 ms":>8} {"speedup":>8} '
+              f'{"prec":>6} {"recall":>6} {"IoU":>6} {"|dconf|":>8} {"depth d%":>9}')
+    print(header)
+    print('-' * len(header))
+    baseline, baseline_p50 = None, None
+    for mode in modes:
+        try:
+            detect, actual = make_detector(mode, args.omz)
+        except Exception as e:
+            print(f'{mode:<6} skipped: {e}')
+            if baseline is None:
+                raise SystemExit('The f32 baseline could not be run')
+            continue
+        latencies, detections = run(detect, images, args.repeat)
+        p50, p95 = np.percentile(latencies * 1000, [50, 95])
+        if baseline is None:
+            baseline, baseline_p50 = detections, p50
+        stats = agreement(baseline, detections, args.iou)
+        print(f'{mode:<6} {actual:<10} {p50:>8.1f} {p95:>8.1f} {baseline_p50 / p50:>7.2f}x '
+              f'{stats["precision"]:>6.3f} {stats["recall"]:>6.3f} {stats["iou"]:>6.3f} '
+              f'{stats["confidence"]:>8.4f} {stats["depth"] * 100:>8.2f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark of response serialization for /places and /directions payloads.
+
+Compares the previous path (marshmallow dump + flask.jsonify with the stdlib
+encoder) with compile_serializer + json_response (orjson when installed).
+
+Usage:
+    python benchmarks/bench_response.py [--places 500] [--points 3000] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from marshmallow import Schema, fields, validate
+from App.Routes.Places.placeSchema import PlaceSchema, Place
+from App.Utils.Response import base_response, json_response, compile_serializer, orjson
+
+
+class RouteSchema(Schema):
+    # The /directions response schema before it was replaced
+    distance = fields.Float(required=True)
+    time = fields.Integer(required=True)
+    instructions = fields.List(fields.Dict(keys=fields.Str(), values=fields.Raw()))
+    coordinates = fields.List(fields.List(fields.Float(), validate=validate.Length(min=2, max=2)))
+
+
+TAG_SAMPLES = {
+    'amenity': ['cafe', 'restaurant', 'pharmacy', 'bank'],
+    'cuisine': ['coffee_shop', 'indonesian', 'regional'],
+    'opening_hours': ['Mo-Su 07:00-22:00', '24/7'],
+    'wheelchair': ['yes', 'limited', 'no'],
+    'addr:street': ['Jalan Sudirman', 'Jalan Thamrin', 'Jalan Gatot Subroto'],
+}
+
+
+def make_places(count):
+    rng = random.Random(42)
+    places = []
+    for i in range(count):
+        tags = {key: rng.choice(values) for key, values in TAG_SAMPLES.items() if rng.random() < 0.8}
+        tags['name'] = f'Tempat {i}'
+        places.append({
+            'id': str(1000000 + i),
+            'name': tags['name'],
+            'latitude': -6.2 + rng.uniform(-0.05, 0.05),
+            'longitude': 106.8 + rng.uniform(-0.05, 0.05),
+            'distance': round(rng.uniform(0, 5000), 1),
+            'tags': tags,
+        })
+    return places
+
+
+def make_route(points, steps=80):
+    rng = random.Random(7)
+    coordinates = [[106.8 + i * 1e-5 + rng.uniform(-1e-6, 1e-6), -6.2 + i * 1e-5] for i in range(points)]
+    instructions = [
+        {
+            'text': f'Di Jalan {i}: Lanjutkan berjalan di Jalan {i} sejauh {rng.randint(10, 400)} meter',
+            'distance': rng.uniform(10, 400),
+            'interval': coordinates[i * points // steps],
+        }
+        for i in range(steps)
+    ]
+    return {'distance': points * 1.4, 'time': points, 'instructions': instructions, 'coordinates': coordinates}
+
+
+def bench(label, fn, repeat):
+    seconds = min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat
+    print(f'  {label:<42} {seconds * 1e3:8.3f} ms')
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--places', type=int, default=500)
+    parser.add_argument('--points', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    places = make_places(args.places)
+    route = make_route(args.points)
+    serialize_places = compile_serializer(Place)
+    print(f'encoder: {"orjson " + orjson.__version__ if orjson else "stdlib json"}')
+
+    with app.app_context():
+        print(f'/places ({args.places} places)')
+        old = bench('marshmallow dump + jsonify', lambda: jsonify(base_response(
+            200, 'success', 'ok', {'places': PlaceSchema(many=True).dump(places), 'count': len(places)}
+        )).get_data(), args.repeat)
+        new = bench('compile_serializer + json_response', lambda: json_response(
+            200, 'success', 'ok', {'places': serialize_places(places), 'count': len(places)}
+        ).get_data(), args.repeat)
+        print(f'  speedup x{old / new:.1f}')
+
+        print(f'/directions ({args.points} points)')
+        old = bench('marshmallow dump + jsonify', lambda: jsonify(base_response(
+            200, 'success', 'ok', {'route': RouteSchema().dump(route)}
+        )).get_data(), args.repeat)
+        new = bench('json_response', lambda: json_response(
+            200, 'success', 'ok', {'route': route}
+        ).get_data(), args.repeat)
+        print(f'  speedup x{old / new:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+End-to-end load test of the Flask app against local Overpass/OSRM stubs.
+
+Drives an open-loop mix of /places/*, /favorites, /settings, /login and
+/predict traffic at a target request rate and reports p50/p95/p99 latency,
+throughput and error rate per endpoint. Requests are sent on a fixed
+(Poisson) schedule and latency is measured from the scheduled send time, so
+a slow server is charged for the queueing it causes instead of silently
+lowering the offered load.
+
+Without --target, the stub upstreams are started in-process and server.py
+is spawned against them with a throwaway database.
+
+Usage:
+    python loadtest/run.py [--rate 50] [--duration 60] [--users 20]
+                           [--mix places_nearby=25,login=10,...]
+                           [--target http://127.0.0.1:5000] [--latency 150]
+"""
+import argparse
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import start_stub_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CENTER = (-6.2, 106.8)  # Jakarta
+PASSWORD = 'loadtest-password'
+
+DEFAULT_MIX = {
+    'places_nearby': 25,
+    'places_search': 10,
+    'places_directions': 10,
+    'favorites_list': 15,
+    'favorites_add': 5,
+    'settings_get': 10,
+    'login': 10,
+    'predict': 15,
+}
+
+# Statuses that are a correct answer rather than an error. Settings rows are
+# not created on registration, so new users get 404 from /settings.
+EXPECTED_STATUSES = {
+    'settings_get': {404},
+}
+
+
+class Client:
+    """Logged-in virtual users sharing per-thread HTTP connection pools."""
+
+    def __init__(self, base_url, users, spread, image):
+        self.base_url = base_url.rstrip('/')
+        self.spread = spread
+        self.image = image
+        self.cookies = []
+        self.emails = [f'loadtest-{i}@example.com' for i in range(users)]
+        self._local = threading.local()
+
+    @property
+    def http(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def setup(self):
+        for email in self.emails:
+            requests.post(f'{self.base_url}/register', json={'email': email, 'password': PASSWORD}, timeout=30)
+            response = requests.post(f'{self.base_url}/login', json={'email': email, 'password': PASSWORD}, timeout=30)
+            response.raise_for_status()
+            self.cookies.append(response.cookies.get_dict())
+
+    def point(self):
+        return (
+            round(CENTER[0] + random.uniform(-self.spread, self.spread), 5),
+            round(CENTER[1] + random.uniform(-self.spread, self.spread), 5),
+        )
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('cookies', random.choice(self.cookies))
+        return self.http.request(method, f'{self.base_url}{path}', timeout=60, **kwargs)
+
+    def places_nearby(self):
+        lat, lon = self.point()
+        return self.request('GET', '/places/nearby', params={'lat': lat, 'lon': lon, 'radius': 1000})
+
+    def places_search(self):
+        lat, lon = self.point()
+        return self.request('GET', '/places/search', params={'query': 'Tempat', 'lat': lat, 'lon': lon, 'radius': 2000})
+
+    def places_directions(self):
+        (start_lat, start_lon), (end_lat, end_lon) = self.point(), self.point()
+        return self.request('GET', '/places/directions', params={
+            'start_lat': start_lat, 'start_lon': start_lon, 'end_lat': end_lat, 'end_lon': end_lon,
+        })
+
+    def favorites_list(self):
+        return self.request('GET', '/favorites')
+
+    def favorites_add(self):
+        lat, lon = self.point()
+        return self.request('POST', '/favorites', json={
+            'place_id': str(random.randint(10 ** 8, 10 ** 10)),
+            'name': 'Tempat favorit',
+            'latitude': lat,
+            'longitude': lon,
+            'tags': {'amenity': 'cafe'},
+        })
+
+    def settings_get(self):
+        return self.request('GET', '/settings')
+
+    def login(self):
+        return self.request('POST', '/login', cookies={}, json={'email': random.choice(self.emails), 'password': PASSWORD})
+
+    def predict(self):
+        return self.request('POST', '/predict', files={'image': ('frame.jpg', self.image, 'image/jpeg')})
+
+
+def make_image(path=None, size=(640, 480)):
+    """
+    Returns:
+        bytes or None: JPEG to send to /predict, None if none can be made
+    """
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    pixels = np.random.default_rng(0).integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {}
+        for item in text.split(','):
+            name, weight = item.split('=')
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f'Unknown scenario: {name}')
+            mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def wait_until(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_server(stub_port, database):
+    env = dict(
+        os.environ,
+        OVERPASS_URL=f'http://127.0.0.1:{stub_port}/api/interpreter',
+        OSRM_URL=f'http://127.0.0.1:{stub_port}/route/v1/foot',
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}',
+        SECRET_KEY=os.environ.get('SECRET_KEY', 'loadtest'),
+        WARMUP_ON_START='true',
+    )
+    return subprocess.Popen(
+        [sys.executable, 'server.py'], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def run(client, mix, rate, duration, concurrency):
+    """
+    Send requests on a Poisson schedule at rate per second for duration seconds.
+
+    Returns:
+        tuple: (results by scenario as lists of (latency, ok), elapsed seconds)
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = defaultdict(list)
+    lock = threading.Lock()
+
+    def send(name, scheduled):
+        try:
+            status = getattr(client, name)().status_code
+            ok = status < 400 or status in EXPECTED_STATUSES.get(name, ())
+        except requests.exceptions.RequestException:
+            ok = False
+        latency = time.perf_counter() - scheduled
+        with lock:
+            results[name].append((latency, ok))
+
+    started = time.perf_counter()
+    next_at = started
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, random.choices(names, weights)[0], next_at)
+            next_at += random.expovariate(rate)
+    return results, time.perf_counter() - started
+
+
+def report(results, elapsed):
+    header = f'{"endpoint":<20} {"count":>7} {"rps":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>8}'
+    print(header)
+    print('-' * len(header))
+    total, total_errors = 0, 0
+    for name in sorted(results):
+        latencies = np.array([latency for latency, _ in results[name]]) * 1000
+        errors = sum(1 for _, ok in results[name] if not ok)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        total += len(latencies)
+        total_errors += errors
+        print(f'{name:<20} {len(latencies):>7} {len(latencies) / elapsed:>8.1f} '
+              f'{p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {errors / len(latencies):>7.1%}')
+    if total:
+        print('-' * len(header))
+        print(f'{"total":<20} {total:>7} {total / elapsed:>8.1f} {"":>29} {total_errors / total:>7.1%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', help='base URL of a running app (default: spawn server.py)')
+    parser.add_argument('--rate', type=float, default=50, help='total requests per second')
+    parser.add_argument('--duration', type=float, default=60, help='seconds')
+    parser.add_argument('--mix', help='scenario weights, e.g. places_nearby=25,login=10')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=64, help='maximum outstanding requests')
+    parser.add_argument('--spread', type=float, default=0.05, help='degrees around the center to sample points from')
+    parser.add_argument('--image', help='JPEG sent to /predict (default: a generated 640x480 frame)')
+    parser.add_argument('--latency', type=float, default=150.0, help='stub upstream latency, milliseconds')
+    parser.add_argument('--jitter', type=float, default=50.0, help='stub upstream jitter, milliseconds')
+    parser.add_argument('--stub-port', type=int, default=8099)
+    parser.add_argument('--ready-timeout', type=float, default=120, help='seconds to wait for /readyz')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    image = make_image(args.image)
+    if image is None and mix.pop('predict', None):
+        print('Pillow is not installed and no --image given; skipping /predict')
+
+    stub, server, target = None, None, args.target
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if target is None:
+                stub = start_stub_server(args.stub_port, args.latency, args.jitter)
+                server = start_server(args.stub_port, os.path.join(tmp, 'loadtest.db'))
+                target = 'http://127.0.0.1:5000'
+            if not wait_until(f'{target}/healthz', 60):
+                raise SystemExit(f'{target} did not come up')
+            if not wait_until(f'{target}/readyz', args.ready_timeout):
+                print('warning: /readyz still failing, /predict errors are expected')
+
+            client = Client(target, args.users, args.spread, image)
+            client.setup()
+            print(f'{args.rate:g} req/s for {args.duration:g}s against {target}')
+            results, elapsed = run(client, mix, args.rate, args.duration, args.concurrency)
+            report(results, elapsed)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+            if stub is not None:
+                stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Local stand-ins for the Overpass and OSRM services.
+
+Recorded responses are replayed from loadtest/fixtures/<service>/<key>.json,
+where key is the SHA-1 of the Overpass query or of the OSRM path and query
+string. Requests without a recording get a deterministic synthetic response
+shaped like the real service's (nodes around the queried point, a
+straight-line route with steps), so the harness also works from a clean
+checkout. With --record, requests are proxied to the public services and
+the responses saved as new fixtures.
+
+Every response is delayed by --latency milliseconds (plus up to --jitter).
+
+Usage:
+    python loadtest/stubs.py [--port 8099] [--latency 150] [--jitter 50] [--record]
+
+    OVERPASS_URL=http://127.0.0.1:8099/api/interpreter \\
+    OSRM_URL=http://127.0.0.1:8099/route/v1/foot python server.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+OVERPASS_UPSTREAM = 'https://overpass-api.de/api/interpreter'
+OSRM_UPSTREAM = 'http://router.project-osrm.org'
+
+AROUND = re.compile(r'around:(\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)')
+AMENITIES = ['cafe', 'restaurant', 'pharmacy', 'bank', 'toilets', 'bench']
+METERS_PER_DEGREE = 111320.0
+
+
+def fixture_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def load_fixture(service, key):
+    path = os.path.join(FIXTURES_DIR, service, f'{key}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def save_fixture(service, key, body):
+    directory = os.path.join(FIXTURES_DIR, service)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{key}.json'), 'wb') as f:
+        f.write(body)
+
+
+def synthetic_overpass(query, count=60):
+    match = AROUND.search(query)
+    radius, lat, lon = (float(v) for v in match.groups()) if match else (1000.0, 0.0, 0.0)
+    rng = random.Random(fixture_key(query))
+    elements = []
+    for i in range(count):
+        distance = radius * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        elements.append({
+            'type': 'node',
+            'id': rng.randint(10 ** 8, 10 ** 10),
+            'lat': lat + distance * math.cos(bearing) / METERS_PER_DEGREE,
+            'lon': lon + distance * math.sin(bearing) / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6)),
+            'tags': {
+                'name': f'Tempat {i}',
+                'amenity': rng.choice(AMENITIES),
+                'wheelchair': rng.choice(['yes', 'limited', 'no']),
+            },
+        })
+    return json.dumps({'version': 0.6, 'generator': 'loadtest stub', 'elements': elements}).encode('utf-8')
+
+
+def synthetic_osrm(path, points_per_step=40, steps=12):
+    coordinates = path.rsplit('/', 1)[-1]
+    (start_lon, start_lat), (end_lon, end_lat) = [
+        tuple(float(v) for v in pair.split(',')) for pair in coordinates.split(';')[:2]
+    ]
+    count = points_per_step * steps + 1
+    line = [
+        [start_lon + (end_lon - start_lon) * i / (count - 1), start_lat + (end_lat - start_lat) * i / (count - 1)]
+        for i in range(count)
+    ]
+    length = math.hypot(
+        (end_lat - start_lat) * METERS_PER_DEGREE,
+        (end_lon - start_lon) * METERS_PER_DEGREE * math.cos(math.radians(start_lat))
+    )
+    step_length = length / steps
+    route_steps = []
+    for i in range(steps + 1):
+        maneuver_type = 'depart' if i == 0 else 'arrive' if i == steps else 'turn'
+        route_steps.append({
+            'name': f'Jalan {i}',
+            'distance': 0 if i == steps else step_length,
+            'duration': 0 if i == steps else step_length / 1.4,
+            'maneuver': {'type': maneuver_type, 'modifier': 'straight', 'location': line[i * points_per_step]},
+            'geometry': {'type': 'LineString', 'coordinates': line[i * points_per_step:(i + 1) * points_per_step + 1]},
+        })
+    return json.dumps({
+        'code': 'Ok',
+        'routes': [{
+            'distance': length,
+            'duration': length / 1.4,
+            'geometry': {'type': 'LineString', 'coordinates': line},
+            'legs': [{'distance': length, 'duration': length / 1.4, 'steps': route_steps}],
+        }],
+        'waypoints': [{'location': line[0]}, {'location': line[-1]}],
+    }).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'UpstreamStub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        latency = self.server.latency + random.uniform(0, self.server.jitter)
+        time.sleep(latency / 1000)
+
+    def _send(self, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _overpass(self, query):
+        key = fixture_key(query)
+        body = load_fixture('overpass', key)
+        if body is None and self.server.record:
+            response = requests.post(OVERPASS_UPSTREAM, data={'data': query}, timeout=60)
+            response.raise_for_status()
+            body = response.content
+            save_fixture('overpass', key, body)
+        self._send(body if body is not None else synthetic_overpass(query))
+
+    def _osrm(self):
+        key = fixture_key(self.path)
+        body = load_fixture('osrm', key)
+        if body is None and self.server.record:
+            response = requests.get(OSRM_UPSTREAM + self.path, timeout=30)
+            body = response.content
+            save_fixture('osrm', key, body)
+        self._send(body if body is not None else synthetic_osrm(urlsplit(self.path).path))
+
+    def do_GET(self):
+        self._delay()
+        url = urlsplit(self.path)
+        if url.path.startswith('/route/'):
+            return self._osrm()
+        if url.path.startswith('/api/interpreter'):
+            return self._overpass(parse_qs(url.query).get('data', [''])[0])
+        self._send(b'{"error": "not found"}', status=404)
+
+    def do_POST(self):
+        self._delay()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        if not urlsplit(self.path).path.startswith('/api/interpreter'):
+            return self._send(b'{"error": "not found"}', status=404)
+        # overpy posts the raw query; browsers and curl send data=<query>
+        query = parse_qs(body).get('data', [body])[0] if body.startswith('data=') else body
+        self._overpass(query)
+
+
+def start_stub_server(port=8099, latency=150.0, jitter=50.0, record=False, host='127.0.0.1'):
+    """
+    Start the stub server on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: Running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.record = record
+    threading.Thread(target=server.serve_forever, name='upstream-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=150.0, help='milliseconds added to every response')
+    parser.add_argument('--jitter', type=float, default=50.0, help='extra random milliseconds, uniform')
+    parser.add_argument('--record', action='store_true', help='proxy misses to the public services and save them')
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.jitter, args.record, args.host)
+    print(f'Overpass: http://{args.host}:{args.port}/api/interpreter')
+    print(f'OSRM:     http://{args.host}:{args.port}/route/v1/foot')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+from App.Routes.CV.cv import Config, ObjectDetector
+from App.Routes.CV.jobs import analyse_video
+
+
+class _Box:
+    def __init__(self, cls_id, conf, xyxy):
+        self.cls = cls_id
+        self.conf = conf
+        self.xyxy = [xyxy]
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeYOLO:
+    """Stands in for the OpenVINO YOLO export; rejects batches larger than a static batch size."""
+
+    names = {0: 'orang'}
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.calls = []
+
+    def __call__(self, frames):
+        if self.batch and len(frames) > self.batch:
+            raise RuntimeError(f'model has a static batch of {self.batch}, got {len(frames)} frames')
+        self.calls.append(len(frames))
+        return [_Result([_Box(0, 0.9, [8, 8, 40, 40])]) for _ in frames]
+
+
+class FakeMiDaS:
+    def output(self, index):
+        return index
+
+    def __call__(self, inputs):
+        return {0: np.ones((1, 1, 256, 256), dtype=np.float32)}
+
+
+def make_detector(batch):
+    detector = ObjectDetector(Config())
+    detector.yolo_model = FakeYOLO(batch)
+    detector.yolo_batch = batch
+    detector.compiled_midas = FakeMiDaS()
+    detector.label_ids = {'orang': 0}
+    return detector
+
+
+def write_video(path, frames, size=(64, 64)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25.0, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20 % 255, dtype=np.uint8))
+    writer.release()
+
+
+@pytest.mark.parametrize('model_batch, expected_calls', [
+    (1, [1] * 10),  # static batch-1 export: one frame per call
+    (0, [8, 2]),  # dynamic batch: one call per chunk
+])
+def test_analyse_video_with_several_frames_per_batch(tmp_path, model_batch, expected_calls):
+    path = str(tmp_path / 'clip.mp4')
+    write_video(path, 10)
+    detector = make_detector(model_batch)
+
+    columns, fps, frames_read = analyse_video(path, detector, stride=1, batch_size=8)
+
+    assert frames_read == 10
+    assert len(columns) == 10
+    assert columns.frame == list(range(10))
+    assert detector.yolo_model.calls == expected_calls